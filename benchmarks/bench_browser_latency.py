@@ -0,0 +1,153 @@
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from aiohttp import web
+from discord.ext import commands
+from PIL import Image
+from upload import PhotoBrowserView, UploadCog
+
+
+PHOTOS = 60
+THINK_TIME = 0.3
+COLD_DELAY = 0.15
+WARM_DELAY = 0.005
+USER_ID = 10**17
+FOLDER = "Portfolio"
+
+
+class FakeResponse:
+    def is_done(self):
+        return True
+
+
+class FakeInteraction:
+    """Stands in for a button click; edit_original_response is where Discord would upload the attachment"""
+
+    def __init__(self):
+        self.response = FakeResponse()
+
+    async def edit_original_response(self, embed, view, attachments):
+        self.image_url = embed.image.url
+
+
+def make_display_rendition():
+    """Encode one noisy 1280px WebP, roughly the size of a real display rendition"""
+    image = Image.frombytes('RGB', (1280, 853), os.urandom(1280 * 853 * 3))
+    output = BytesIO()
+    image.save(output, format='WEBP', quality=82, method=4)
+    return output.getvalue()
+
+
+async def make_photos(cog):
+    data = make_display_rendition()
+    os.makedirs(f'photos/{USER_ID}/{FOLDER}', exist_ok=True)
+    for i in range(PHOTOS):
+        filename = f"{i:04d}_display.webp"
+        with open(f'photos/{USER_ID}/{FOLDER}/{filename}', 'wb') as f:
+            f.write(data)
+        await cog.store.add_photo(USER_ID, FOLDER, {
+            'filename': filename,
+            'cdn_url': 'https://cdn.example/unused',
+            'uploaded_at': f"2024-01-01 00:00:{i % 60:02d}",
+            'title': f"Photo {i}",
+            'size': len(data),
+            'renditions': {'display': {'filename': filename, 'format': 'webp', 'width': 1280, 'height': 853, 'size': len(data)}}
+        })
+
+
+def make_cdn():
+    """A local stand-in for a CDN: the first request for a path is slow (cache miss), later ones are fast"""
+    seen = set()
+
+    async def handler(request):
+        await asyncio.sleep(WARM_DELAY if request.path in seen else COLD_DELAY)
+        seen.add(request.path)
+        with open(f"photos/{request.match_info['path']}", 'rb') as f:
+            return web.Response(body=f.read())
+
+    app = web.Application()
+    app.router.add_get('/{run}/{path:.+}', handler)
+    return app
+
+
+async def browse(cog, prefetch, client):
+    """Click Next through the folder and back again, timing click -> image shown to the user"""
+    target = discord.Object(id=USER_ID)
+    view = PhotoBrowserView(cog, target, target, FOLDER, PHOTOS, prefetch=prefetch)
+    interaction = FakeInteraction()
+    await view.update_view(interaction)
+
+    steps = [1] * (PHOTOS - 1) + [-1] * (PHOTOS // 2)
+    latencies = []
+    for step in steps:
+        await asyncio.sleep(THINK_TIME * (0.5 + random.random()))
+        view.current_index += step
+
+        started = time.perf_counter()
+        await view.update_view(interaction)
+        if client is not None:
+            async with client.get(interaction.image_url) as resp:
+                await resp.read()
+        latencies.append(time.perf_counter() - started)
+
+    view.stop()
+    await view.on_timeout()
+    return latencies
+
+
+def summarize(latencies):
+    cuts = statistics.quantiles(latencies, n=100)
+    return cuts[49] * 1000, cuts[94] * 1000
+
+
+async def run():
+    bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+    cog = UploadCog(bot)
+    await make_photos(cog)
+
+    runner = web.AppRunner(make_cdn())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    print(f"{'mode':<24} {'prefetch':>8} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    try:
+        for mode in ("attachment", "photo_base_url"):
+            for prefetch in (0, 1):
+                if mode == "photo_base_url":
+                    cog.config["photo_base_url"] = f"http://127.0.0.1:{port}/run{prefetch}"
+                    client = cog.http
+                else:
+                    cog.config["photo_base_url"] = ""
+                    client = None
+
+                p50, p95 = summarize(await browse(cog, prefetch, client))
+                print(f"{mode:<24} {prefetch:>8} {p50:>9.2f} {p95:>9.2f}")
+    finally:
+        await cog.http.close()
+        await runner.cleanup()
+        bot.store.close()
+
+
+def main():
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            asyncio.run(run())
+        finally:
+            os.chdir(root)
+
+
+if __name__ == "__main__":
+    main()
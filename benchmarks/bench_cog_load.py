@@ -0,0 +1,67 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from discord.ext import commands
+from upload import UploadCog
+
+
+USER_COUNTS = [0, 1_000, 10_000, 50_000]
+RUNS = 5
+
+
+def make_users(count):
+    """Create profiles/{id}.json files for count users"""
+    os.makedirs('profiles', exist_ok=True)
+    for user_id in range(10**17, 10**17 + count):
+        with open(f'profiles/{user_id}.json', 'w') as f:
+            json.dump({'user_id': user_id}, f)
+
+
+def legacy_scan():
+    """The old UploadCog._ensure_photo_directories, kept for comparison"""
+    for filename in os.listdir('profiles'):
+        if filename.endswith('.json'):
+            user_photo_dir = f'photos/{filename.split(".")[0]}'
+            if not os.path.exists(user_photo_dir):
+                os.makedirs(user_photo_dir)
+
+
+async def time_cog_load():
+    """Time add_cog(UploadCog(bot)) on a bot that never connects"""
+    bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+    started = time.perf_counter()
+    await bot.add_cog(UploadCog(bot))
+    elapsed = time.perf_counter() - started
+    await bot.remove_cog('UploadCog')
+    bot.store.close()
+    return elapsed
+
+
+def main():
+    root = os.getcwd()
+    print(f"{'users':>8} {'cog load (ms)':>14} {'legacy scan (ms)':>17}")
+
+    for count in USER_COUNTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            make_users(count)
+
+            load_times = [asyncio.run(time_cog_load()) for _ in range(RUNS)]
+
+            started = time.perf_counter()
+            legacy_scan()
+            scan_time = time.perf_counter() - started
+
+            print(f"{count:>8} {min(load_times) * 1000:>14.2f} {scan_time * 1000:>17.2f}")
+            os.chdir(root)
+
+
+if __name__ == "__main__":
+    main()
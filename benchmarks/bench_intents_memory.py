@@ -0,0 +1,84 @@
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+import bot
+
+
+GUILD_SIZES = [100, 1_000, 10_000, 50_000]
+MESSAGES_PER_GUILD = 2_000
+
+PROFILES = {
+    "Intents.all() (old)": (discord.Intents.all(), None, 1000),
+    "bot.py (current)": (bot.intents, bot.member_cache_flags, bot.max_messages)
+}
+
+
+def user_payload(user_id):
+    return {'id': str(user_id), 'username': f'user{user_id}', 'discriminator': '0', 'avatar': None, 'global_name': None}
+
+
+def guild_payload(guild_id, size, intents):
+    """Build the GUILD_CREATE payload Discord would send (after chunking) for these intents"""
+    member_count = size if intents.members else 1
+    members = [
+        {'user': user_payload(10**17 + i), 'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00', 'deaf': False, 'mute': False, 'flags': 0}
+        for i in range(member_count)
+    ]
+    presences = [
+        {'user': {'id': str(10**17 + i)}, 'status': 'online', 'activities': [{'name': 'Lightroom', 'type': 0}], 'client_status': {'desktop': 'online'}}
+        for i in range(size // 2)
+    ] if intents.presences else []
+
+    return {
+        'id': str(guild_id), 'name': 'guild', 'icon': None, 'owner_id': '1', 'member_count': size,
+        'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0, 'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}],
+        'channels': [{'id': str(guild_id + 1), 'type': 0, 'name': 'general', 'position': 0, 'permission_overwrites': []}],
+        'members': members, 'presences': presences, 'emojis': [], 'stickers': [], 'features': [],
+        'threads': [], 'stage_instances': [], 'guild_scheduled_events': [], 'voice_states': []
+    }
+
+
+def message_payload(message_id, channel_id):
+    return {
+        'id': str(message_id), 'channel_id': str(channel_id), 'author': user_payload(10**17), 'content': 'Nice shot! ' * 8,
+        'timestamp': '2024-01-01T00:00:00+00:00', 'edited_timestamp': None, 'tts': False, 'mention_everyone': False,
+        'mentions': [], 'mention_roles': [], 'attachments': [], 'embeds': [], 'pinned': False, 'type': 0
+    }
+
+
+def measure(intents, member_cache_flags, max_messages, size):
+    """Cache one guild of the given size and its message traffic, returning retained KiB"""
+    client = discord.Client(intents=intents, member_cache_flags=member_cache_flags, max_messages=max_messages)
+    state = client._connection
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    guild = state._add_guild_from_data(guild_payload(10**18, size, intents))
+    if intents.guild_messages and state._messages is not None:
+        channel = guild.text_channels[0]
+        for i in range(MESSAGES_PER_GUILD):
+            state._messages.append(discord.Message(state=state, channel=channel, data=message_payload(5 * 10**17 + i, channel.id)))
+
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return retained / 1024, len(guild.members)
+
+
+def main():
+    print(f"{'profile':<22} {'guild size':>10} {'cached members':>15} {'retained KiB':>13}")
+    for name, (intents, member_cache_flags, max_messages) in PROFILES.items():
+        for size in GUILD_SIZES:
+            retained, members = measure(intents, member_cache_flags, max_messages, size)
+            print(f"{name:<22} {size:>10} {members:>15} {retained:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
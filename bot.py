@@ -1,39 +1,109 @@
+import asyncio
+import hashlib
+import json
 import os
+import time
 from discord.ext import commands
-from discord import Intents, Activity, ActivityType
+from discord import Intents, Activity, ActivityType, MemberCacheFlags
 from dotenv import load_dotenv
+from fileutils import write_atomic
+from settings import load_config
 
 load_dotenv()
 
-intents = Intents.all()
-bot = commands.Bot(command_prefix='!', intents=intents)
+COGS = ["profile", "upload"]
+COMMAND_HASH_PATH = '.command_tree_hash'
 
-async def load_cogs():
-    cogs = ["profile", "upload"]
-    for cog in cogs:
-        try:
-            await bot.load_extension(f"cogs.{cog}")
-            print(f"✅ Cog loaded successfully: {cog}")
-        except Exception as e:
-            print(f"❌ Failed to load cog {cog}: {str(e)}")
+started_at = time.perf_counter()
 
-@bot.event
-async def on_ready():
-    activity = Activity(name="Prototype 2", type=ActivityType.playing)
-    await bot.change_presence(activity=activity)
-    print(f'Logged in as {bot.user}')
-    print(f'Bot is in {len(bot.guilds)} guilds')
 
-    await load_cogs()
+def parse_shard_ids(value):
+    """Parse SHARD_IDS like "0-3" or "0,1,2,3" into a list of shard ids"""
+    if not value:
+        return None
+
+    shard_ids = []
+    for part in value.split(','):
+        if '-' in part:
+            start, end = part.split('-')
+            shard_ids.extend(range(int(start), int(end) + 1))
+        else:
+            shard_ids.append(int(part))
+    return shard_ids
+
+
+class PhotographyBot(commands.AutoShardedBot):
+    async def setup_hook(self):
+        """Load cogs and sync slash commands once, before connecting to the gateway"""
+        phase_start = time.perf_counter()
+        await load_cogs()
+        print(f"⏱️ Loaded cogs in {(time.perf_counter() - phase_start) * 1000:.0f} ms")
+
+        # Logging command tree
+        print("Current command tree:")
+        for command in self.tree.get_commands():
+            print(f"- {command.name}, Description: {command.description}")
+
+        # Commands are global, so only the process that owns shard 0 syncs them
+        if self.shard_ids is None or 0 in self.shard_ids:
+            phase_start = time.perf_counter()
+            await sync_commands()
+            print(f"⏱️ Command sync check took {(time.perf_counter() - phase_start) * 1000:.0f} ms")
+
+
+# Slash commands and buttons arrive as interactions, which carry the member and
+# their permissions, so only the guilds intent (for channel lookups) is needed.
+intents = Intents.none()
+intents.guilds = True
+member_cache_flags = MemberCacheFlags.none()
+max_messages = None
+
+shard_count = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+shard_ids = parse_shard_ids(os.getenv('SHARD_IDS'))
+if shard_ids is not None and shard_count is None:
+    print("❌ SHARD_IDS is set without SHARD_COUNT, ignoring it and sharding automatically")
+    shard_ids = None
 
-    # Logging command tree
-    print("Current command tree:")
-    for command in bot.tree.get_commands():
-        print(f"- {command.name}, Description: {command.description}")
+activity = Activity(name="Prototype 2", type=ActivityType.playing)
+bot = PhotographyBot(
+    command_prefix='!',
+    intents=intents,
+    activity=activity,
+    member_cache_flags=member_cache_flags,
+    max_messages=max_messages,
+    chunk_guilds_at_startup=False,
+    shard_count=shard_count,
+    shard_ids=shard_ids
+)
+
+async def load_cog(cog):
+    try:
+        await bot.load_extension(f"cogs.{cog}")
+        print(f"✅ Cog loaded successfully: {cog}")
+    except Exception as e:
+        print(f"❌ Failed to load cog {cog}: {str(e)}")
+
+async def load_cogs():
+    await asyncio.gather(*(load_cog(cog) for cog in COGS))
+
+def command_tree_hash():
+    """Hash the command tree payload so unchanged commands are never re-synced"""
+    payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands()]
+    data = json.dumps({"application_id": bot.application_id, "commands": payload}, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+async def sync_commands():
+    tree_hash = command_tree_hash()
+    if os.path.exists(COMMAND_HASH_PATH):
+        with open(COMMAND_HASH_PATH, 'r') as f:
+            if f.read().strip() == tree_hash:
+                print("✅ Slash commands unchanged, skipping sync")
+                return
 
     print("Syncing slash commands...")
     try:
         synced = await bot.tree.sync()
+        write_atomic(COMMAND_HASH_PATH, tree_hash.encode())
         print(f"✅ Synced {len(synced)} slash command(s)")
     except Exception as e:
         print(f"❌ Failed to sync slash commands: {str(e)}")
@@ -41,5 +111,14 @@ async def on_ready():
         for command in bot.tree.get_commands():
             print(f"Command: {command.name}, Description: {command.description}")
 
-token = os.getenv('tkn')
-bot.run(token)
\ No newline at end of file
+@bot.event
+async def on_ready():
+    print(f'Logged in as {bot.user} (shards {bot.shard_ids or "auto"} of {bot.shard_count})')
+    print(f'Bot is in {len(bot.guilds)} guilds')
+    print(f"⏱️ Ready {time.perf_counter() - started_at:.2f}s after start")
+
+if __name__ == "__main__":
+    # Fail before connecting if config.json has an invalid setting
+    load_config()
+    token = os.getenv('tkn')
+    bot.run(token)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import copy
+import time
+from collections import OrderedDict
+
+
+MISSING = object()
+
+
+class LRUCache:
+    """Bounded least-recently-used cache with a per-entry time to live and hit/miss counters; values are copied in and out so callers can't change what other readers see"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._writes = 0
+
+    def get(self, key, default=MISSING):
+        """Get a cached value, or default if it is missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[0])
+
+    def token(self):
+        """Get a token to pass to fill() so a read started before a write can't cache stale data"""
+        return self._writes
+
+    def fill(self, key, value, token):
+        """Cache a value read from storage, unless something was written since token was taken"""
+        if token == self._writes:
+            self._store(key, value)
+
+    def set(self, key, value):
+        """Write-through: cache a value that was just written to storage"""
+        self._writes += 1
+        self._store(key, value)
+
+    def invalidate(self, key):
+        """Drop a key after its stored value changed"""
+        self._writes += 1
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        self._writes += 1
+        self._entries.clear()
+
+    def _store(self, key, value):
+        self._entries[key] = (copy.deepcopy(value), time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Get the cache's size and hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import aiohttp
+from dotenv import load_dotenv
+
+
+async def recommended_shard_count(token):
+    """Ask Discord how many shards this bot should run"""
+    headers = {'Authorization': f'Bot {token}'}
+    async with aiohttp.ClientSession() as session:
+        async with session.get('https://discord.com/api/v10/gateway/bot', headers=headers) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+            return data['shards']
+
+
+def split_shards(shard_count, processes):
+    """Split shard ids 0..shard_count-1 into contiguous ranges, one per process"""
+    per_process, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for i in range(processes):
+        size = per_process + (1 if i < extra else 0)
+        if size:
+            ranges.append((start, start + size - 1))
+        start += size
+    return ranges
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Run the bot as several processes, each owning a range of shards")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="number of bot processes")
+    parser.add_argument('--shard-count', type=int, default=None, help="total shards (default: Discord's recommendation)")
+    args = parser.parse_args()
+
+    shard_count = args.shard_count or asyncio.run(recommended_shard_count(os.getenv('tkn')))
+    bot_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.py')
+
+    children = []
+    for start, end in split_shards(shard_count, args.processes):
+        env = {**os.environ, 'SHARD_COUNT': str(shard_count), 'SHARD_IDS': f'{start}-{end}'}
+        print(f"Starting shards {start}-{end} of {shard_count}")
+        children.append(subprocess.Popen([sys.executable, bot_path], env=env))
+
+    try:
+        for child in children:
+            child.wait()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.wait()
+
+
+if __name__ == "__main__":
+    main()
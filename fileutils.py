@@ -0,0 +1,60 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+IO_THREADS = 4
+
+_io_executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix='file-io')
+
+
+async def run_io(func, *args):
+    """Run a blocking file operation on the file I/O thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, func, *args)
+
+
+def read_file(path):
+    """Read a whole file, or return None if it doesn't exist"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def remove_file(path):
+    """Delete a file if it exists"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_atomic(path, data):
+    """Write bytes to path via a temp file, fsync and os.replace"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def append_line(path, line):
+    """Append a line of text to a log file, creating it if needed"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line + '\n')
@@ -0,0 +1,102 @@
+import asyncio
+import random
+from contextlib import asynccontextmanager
+import aiohttp
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class DownloadError(Exception):
+    """Raised when a download fails after all retries"""
+
+
+class DownloadTooLarge(DownloadError):
+    """Raised when a download is bigger than the allowed size"""
+
+
+class HTTPClient:
+    """Shared aiohttp session with keep-alive pooling, timeouts and retries"""
+
+    def __init__(self, limit=100, limit_per_host=10, timeout=30, retries=3, backoff=0.5, max_backoff=30):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._session = None
+
+    async def start(self):
+        """Open the pooled session"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=300,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+    async def close(self):
+        """Close the session and every pooled connection"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _delay(self, attempt, resp=None):
+        """Exponential backoff with jitter, honouring Retry-After when given, never longer than max_backoff"""
+        delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+        if resp is not None and resp.headers.get('Retry-After'):
+            try:
+                delay = max(0.0, float(resp.headers['Retry-After']))
+            except ValueError:
+                pass
+        return min(delay, self.max_backoff)
+
+    @asynccontextmanager
+    async def get(self, url):
+        """GET a URL, retrying connection errors and retryable statuses"""
+        await self.start()
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                resp = await self._session.get(url)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if last_attempt:
+                    raise DownloadError(f"Failed to download image: {e}")
+                await asyncio.sleep(self._delay(attempt))
+                continue
+
+            if resp.status in RETRY_STATUSES and not last_attempt:
+                delay = self._delay(attempt, resp)
+                resp.release()
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                if resp.status != 200:
+                    raise DownloadError(f"Failed to download image (HTTP {resp.status})")
+                yield resp
+            finally:
+                resp.release()
+            return
+
+    async def download(self, url, write, max_bytes=None, chunk_size=65536):
+        """Stream a URL in chunks to the write coroutine function, refusing anything over max_bytes"""
+        async with self.get(url) as resp:
+            if max_bytes and resp.content_length and resp.content_length > max_bytes:
+                raise DownloadTooLarge(f"This image is too large (max {max_bytes // (1024 * 1024)} MB)")
+
+            total = 0
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                total += len(chunk)
+                if max_bytes and total > max_bytes:
+                    raise DownloadTooLarge(f"This image is too large (max {max_bytes // (1024 * 1024)} MB)")
+                await write(chunk)
+
+            return total
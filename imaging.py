@@ -0,0 +1,238 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from PIL import ExifTags, Image, ImageOps
+from fileutils import write_atomic
+
+
+RENDITIONS = {
+    'full': 4096,
+    'display': 1280,
+    'thumb': 256
+}
+
+QUALITY = {
+    'full': 90,
+    'display': 82,
+    'thumb': 75
+}
+
+EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+    'PNG': 'png'
+}
+
+
+EXIF_IFD = 0x8769
+
+
+class ProcessorBusy(Exception):
+    """Raised when the image processing queue is full"""
+
+
+class ImageTooLarge(Exception):
+    """Raised when an image has more pixels than allowed"""
+
+
+def fit_size(width, height, max_dimension):
+    """Scale (width, height) down so the longest side is at most max_dimension"""
+    if width <= max_dimension and height <= max_dimension:
+        return width, height
+
+    if width > height:
+        return max_dimension, int(height * (max_dimension / width))
+    return int(width * (max_dimension / height)), max_dimension
+
+
+def has_transparency(image):
+    """Check whether an image has an alpha channel or a transparent palette entry"""
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def dhash(image, hash_size=8):
+    """Difference hash: one bit per pixel of a small grayscale copy, set when it is brighter than its right neighbour"""
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            offset = row * (hash_size + 1) + col
+            value = (value << 1) | (pixels[offset] > pixels[offset + 1])
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def _exif_text(value):
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'ignore')
+    value = ' '.join(str(value).replace('\x00', ' ').split()) if value is not None else ''
+    return value or None
+
+
+def _exif_number(value):
+    if isinstance(value, tuple):
+        value = value[0] if value else None
+    try:
+        number = float(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return number if number > 0 else None
+
+
+def extract_exif(image):
+    """Read camera, lens and exposure settings from an opened image's EXIF header, normalised for indexing"""
+    try:
+        exif = image.getexif()
+        details = {**exif, **exif.get_ifd(EXIF_IFD)}
+    except Exception:
+        return {}
+
+    tags = ExifTags.Base
+    make = _exif_text(details.get(tags.Make))
+    model = _exif_text(details.get(tags.Model))
+    if make and model and model.lower().startswith(make.split()[0].lower()):
+        camera = model
+    else:
+        camera = ' '.join(part for part in (make, model) if part) or None
+
+    lens = _exif_text(details.get(tags.LensModel))
+    iso = _exif_number(details.get(tags.ISOSpeedRatings))
+    focal_length = _exif_number(details.get(tags.FocalLength))
+    focal_length_35mm = _exif_number(details.get(tags.FocalLengthIn35mmFilm))
+    aperture = _exif_number(details.get(tags.FNumber))
+    exposure = _exif_number(details.get(tags.ExposureTime))
+
+    result = {
+        'camera': camera,
+        'lens': lens,
+        'iso': int(iso) if iso else None,
+        'focal_length': round(focal_length, 1) if focal_length else None,
+        'focal_length_35mm': int(focal_length_35mm) if focal_length_35mm else None,
+        'aperture': round(aperture, 1) if aperture else None,
+        'exposure': (f"1/{round(1 / exposure)}" if exposure < 1 else f"{exposure:g}") if exposure else None,
+        'taken_at': _exif_text(details.get(tags.DateTimeOriginal))
+    }
+    return {key: value for key, value in result.items() if value is not None}
+
+
+def open_checked(path, max_pixels):
+    """Open an image lazily, refusing anything over max_pixels before it is decoded"""
+    image = Image.open(path)
+    width, height = image.size
+    if width * height > max_pixels:
+        image.close()
+        raise ImageTooLarge(f"This image is too large ({width}x{height}, max {max_pixels // 1_000_000} MP)")
+    return image
+
+
+def hash_image(path, max_pixels):
+    """Compute an image file's difference hash from a thumbnail-sized decode, which can be a bit or two off the hash process_image takes (runs in a worker process)"""
+    max_dimension = min(RENDITIONS.values())
+    with open_checked(path, max_pixels) as image:
+        if image.format == 'JPEG':
+            image.draft(None, fit_size(*image.size, max_dimension))
+        upright = ImageOps.exif_transpose(image)
+        source = upright.convert('RGBA' if has_transparency(upright) else 'RGB')
+
+    return dhash(source.resize(fit_size(*source.size, max_dimension), Image.LANCZOS, reducing_gap=3.0))
+
+
+def encode_image(image, image_format, quality):
+    """Encode an image with settings tuned for each format"""
+    output = BytesIO()
+    if image_format == 'PNG':
+        image.save(output, format='PNG', optimize=True)
+    elif image_format == 'WEBP':
+        image.save(output, format='WEBP', quality=quality, method=4)
+    else:
+        image.save(output, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def process_image(path, output_dir, photo_id, max_pixels, image_format='WEBP', renditions=RENDITIONS):
+    """Decode an image once, write a resized copy for every rendition size and hash the smallest, returning {'renditions', 'dhash', 'exif'} (runs in a worker process)"""
+    results = {}
+    written = []
+
+    try:
+        with open_checked(path, max_pixels) as image:
+            width, height = image.size
+            exif = extract_exif(image)
+            if image.format == 'JPEG':
+                image.draft(None, fit_size(width, height, max(renditions.values())))
+            upright = ImageOps.exif_transpose(image)
+
+            if has_transparency(upright):
+                output_format = 'PNG'
+                source = upright.convert('RGBA')
+            else:
+                output_format = image_format
+                source = upright.convert('RGB')
+
+        for name, max_dimension in sorted(renditions.items(), key=lambda item: item[1], reverse=True):
+            new_size = fit_size(*source.size, max_dimension)
+            if source.size != new_size:
+                source = source.resize(new_size, Image.LANCZOS, reducing_gap=3.0)
+
+            data = encode_image(source, output_format, QUALITY.get(name, 85))
+            filename = f"{photo_id}_{name}.{EXTENSIONS[output_format]}"
+            output_path = os.path.join(output_dir, filename)
+            write_atomic(output_path, data)
+            written.append(output_path)
+
+            results[name] = {
+                'filename': filename,
+                'format': output_format.lower(),
+                'width': source.width,
+                'height': source.height,
+                'size': len(data)
+            }
+
+        image_hash = dhash(source)
+    except BaseException:
+        for output_path in written:
+            os.remove(output_path)
+        raise
+
+    return {'renditions': results, 'dhash': image_hash, 'exif': exif}
+
+
+class ImageProcessor:
+    """Runs Pillow work in a process pool so it never blocks the event loop"""
+
+    def __init__(self, workers=0, queue_size=8, queue_timeout=30):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._executor = None
+        self._slots = asyncio.Semaphore(self.workers + self.queue_size)
+
+    def start(self):
+        """Start the worker processes"""
+        if self._executor is None:
+            # Forking copies a process that already runs threads (the store, file I/O, aiohttp), which can deadlock
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+
+    def shutdown(self):
+        """Stop the worker processes, dropping anything still queued"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool, waiting for a free slot if the queue is full"""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ProcessorBusy("The image processor is busy, please try again shortly")
+
+        try:
+            self.start()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._slots.release()
@@ -0,0 +1,30 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class KeyedLocks:
+    """Hands out one asyncio.Lock (or a Semaphore with limit slots) per key, dropping each lock once nobody holds or waits on it"""
+
+    def __init__(self, limit=1):
+        self.limit = limit
+        self._locks = {}
+        self._waiters = {}
+
+    @asynccontextmanager
+    async def __call__(self, key):
+        """Hold the lock for key"""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock() if self.limit == 1 else asyncio.Semaphore(self.limit)
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
+
+    def __len__(self):
+        return len(self._locks)
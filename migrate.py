@@ -0,0 +1,314 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from imaging import ImageTooLarge, hash_image
+from settings import load_config
+from storage import NEXT_PROFILE_REVISION, upgrade_schema
+
+
+PROGRESS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS imported_files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+"""
+
+
+class InvalidRecord(Exception):
+    """Raised when a JSON file can't be imported"""
+
+
+def find_files(profiles_dir, photos_dir):
+    """List every profile and photo metadata file in the old JSON tree"""
+    files = []
+
+    if os.path.isdir(profiles_dir):
+        for entry in os.scandir(profiles_dir):
+            if entry.is_file() and entry.name.endswith('.json'):
+                files.append(('profile', entry.path))
+
+    if os.path.isdir(photos_dir):
+        for entry in os.scandir(photos_dir):
+            metadata_path = os.path.join(entry.path, 'metadata.json')
+            if entry.is_dir() and os.path.isfile(metadata_path):
+                files.append(('photos', metadata_path))
+
+    return files
+
+
+def parse_user_id(value):
+    """Parse a Discord user id, raising InvalidRecord if it isn't one"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidRecord(f"invalid user id {value!r}")
+
+
+def load_profile(path):
+    """Read and validate a profiles/{id}.json file"""
+    with open(path, 'r') as f:
+        profile_data = json.load(f)
+
+    if not isinstance(profile_data, dict):
+        raise InvalidRecord("profile is not an object")
+
+    file_user_id = os.path.splitext(os.path.basename(path))[0]
+    profile_data['user_id'] = parse_user_id(profile_data.get('user_id', file_user_id))
+
+    return {
+        'profiles': [(
+            profile_data['user_id'],
+            int(bool(profile_data.get('verified', False))),
+            profile_data.get('updated_at'),
+            json.dumps(profile_data)
+        )]
+    }
+
+
+def load_photo_metadata(path):
+    """Read and validate a photos/{id}/metadata.json file"""
+    with open(path, 'r') as f:
+        metadata = json.load(f)
+
+    if not isinstance(metadata, dict):
+        raise InvalidRecord("metadata is not an object")
+
+    user_id = parse_user_id(os.path.basename(os.path.dirname(path)))
+    photos_by_folder = metadata.get('photos', {})
+    if not isinstance(photos_by_folder, dict):
+        raise InvalidRecord("photos is not an object")
+
+    rows = {'photo_users': [], 'folders': [], 'photos': []}
+
+    folders = metadata.get('folders', [])
+    if not isinstance(folders, list):
+        raise InvalidRecord("folders is not a list")
+
+    if metadata.get('agreed_to_terms'):
+        rows['photo_users'].append((user_id, 1, metadata.get('agreed_at')))
+
+    for folder_name in folders + list(photos_by_folder):
+        rows['folders'].append((user_id, folder_name))
+
+    for folder_name, photos in photos_by_folder.items():
+        for photo in photos:
+            if not isinstance(photo, dict) or not photo.get('filename') or not photo.get('uploaded_at'):
+                raise InvalidRecord(f"photo in {folder_name!r} is missing filename or uploaded_at")
+
+            rows['photos'].append((user_id, folder_name, photo['filename'], photo['uploaded_at'], json.dumps(photo)))
+
+    return rows
+
+
+def load_file(kind, path):
+    """Load one file, returning (path, mtime, rows, error)"""
+    try:
+        mtime = os.path.getmtime(path)
+        loader = load_profile if kind == 'profile' else load_photo_metadata
+        return path, mtime, loader(path), None
+    except (OSError, ValueError, InvalidRecord) as e:
+        return path, None, None, str(e)
+
+
+INSERTS = {
+    'profiles': (
+        f"INSERT INTO profiles (user_id, verified, updated_at, data, revision) VALUES (?, ?, ?, ?, {NEXT_PROFILE_REVISION}) "
+        "ON CONFLICT(user_id) DO UPDATE SET "
+        "verified = excluded.verified, updated_at = excluded.updated_at, data = excluded.data, revision = excluded.revision"
+    ),
+    'photo_users': (
+        "INSERT INTO photo_users (user_id, agreed_to_terms, agreed_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(user_id) DO UPDATE SET agreed_to_terms = excluded.agreed_to_terms, agreed_at = excluded.agreed_at"
+    ),
+    'folders': "INSERT OR IGNORE INTO folders (user_id, name) VALUES (?, ?)",
+    'photos': (
+        "INSERT INTO photos (user_id, folder, filename, uploaded_at, data) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(user_id, folder, filename) DO UPDATE SET uploaded_at = excluded.uploaded_at, data = excluded.data"
+    )
+}
+
+
+def write_batch(conn, batch):
+    """Insert a batch of loaded files in one transaction, updating rows from files that changed, and return the number of rows written"""
+    written = 0
+    with conn:
+        for table, sql in INSERTS.items():
+            rows = [row for _, _, file_rows in batch for row in file_rows.get(table, [])]
+            if rows:
+                written += conn.executemany(sql, rows).rowcount
+        conn.executemany(
+            "INSERT OR REPLACE INTO imported_files (path, mtime) VALUES (?, ?)",
+            [(path, mtime) for path, mtime, _ in batch]
+        )
+    return written
+
+
+def find_rendition(photos_dir, user_id, folder_name, photo):
+    """Get the path of a photo's smallest stored rendition"""
+    renditions = photo.get('renditions')
+    filename = min(renditions.values(), key=lambda r: r['size'])['filename'] if renditions else photo['filename']
+    if photo.get('blob'):
+        return os.path.join(photos_dir, 'blobs', photo['blob'][:2], filename)
+    return os.path.join(photos_dir, str(user_id), folder_name, filename)
+
+
+def hash_photo(photos_dir, max_pixels, row):
+    """Hash one photo's stored rendition, returning (photo_id, user_id, blob, dhash, error)"""
+    photo_id, user_id, folder_name, data = row
+    photo = json.loads(data)
+    try:
+        path = find_rendition(photos_dir, user_id, folder_name, photo)
+        if not photo.get('renditions') and not os.path.exists(path):
+            # Photos from the JSON era were never kept on disk, so there is nothing to hash
+            return photo_id, user_id, photo.get('blob'), None, None
+        return photo_id, user_id, photo.get('blob'), hash_image(path, max_pixels), None
+    except (OSError, ValueError, KeyError, ImageTooLarge) as e:
+        return photo_id, user_id, photo.get('blob'), None, str(e)
+
+
+def write_hashes(conn, hashes):
+    """Record a batch of backfilled hashes in one transaction"""
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO photo_hashes (photo_id, user_id, dhash) VALUES (?, ?, ?)",
+            [(photo_id, user_id, image_hash) for photo_id, user_id, _, image_hash in hashes]
+        )
+        conn.executemany(
+            "UPDATE blobs SET dhash = ? WHERE digest = ? AND dhash IS NULL",
+            [(image_hash, blob) for _, _, blob, image_hash in hashes if blob]
+        )
+
+
+def backfill_hashes(conn, photos_dir='photos', max_pixels=100_000_000, batch_size=500, workers=8):
+    """Hash photos stored before perceptual hashes were indexed, from their renditions on disk"""
+    rows = conn.execute(
+        "SELECT photos.id, photos.user_id, photos.folder, photos.data FROM photos "
+        "LEFT JOIN photo_hashes ON photo_hashes.photo_id = photos.id WHERE photo_hashes.photo_id IS NULL"
+    ).fetchall()
+    if not rows:
+        return 0
+    print(f"Found {len(rows)} photo(s) without a perceptual hash")
+
+    hashed = 0
+    missing = 0
+    batch = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for photo_id, user_id, blob, image_hash, error in executor.map(lambda row: hash_photo(photos_dir, max_pixels, row), rows):
+            if error:
+                print(f"❌ Could not hash photo {photo_id}: {error}")
+                continue
+            if image_hash is None:
+                missing += 1
+                continue
+
+            batch.append((photo_id, user_id, blob, image_hash))
+            if len(batch) >= batch_size:
+                write_hashes(conn, batch)
+                hashed += len(batch)
+                batch = []
+
+        if batch:
+            write_hashes(conn, batch)
+            hashed += len(batch)
+
+    if missing:
+        print(f"Skipped {missing} photo(s) uploaded before files were kept on disk, they can't be hashed or found by /similar")
+    print(f"✅ Hashed {hashed} photo(s)")
+    return hashed
+
+
+def enqueue_unverified(conn):
+    """Add every unverified profile that isn't queued yet to the verification queue, using its updated_at as the submission time"""
+    with conn:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO verification_queue (user_id, submitted_at) "
+            "SELECT user_id, COALESCE(updated_at, ?) FROM profiles WHERE verified = 0",
+            (time.strftime("%Y-%m-%d %H:%M:%S"),)
+        )
+    print(f"✅ Queued {cursor.rowcount} unverified profile(s) for verification")
+    return cursor.rowcount
+
+
+def migrate(database_path, profiles_dir='profiles', photos_dir='photos', batch_size=500, workers=8, max_pixels=100_000_000, enqueue=False):
+    """Import the JSON tree into the database, skipping files already imported unchanged, then hash any photos missing a perceptual hash"""
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(database_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    upgrade_schema(conn)
+    conn.executescript(PROGRESS_SCHEMA)
+
+    imported = dict(conn.execute("SELECT path, mtime FROM imported_files"))
+    files = [
+        (kind, path) for kind, path in find_files(profiles_dir, photos_dir)
+        if imported.get(path) != os.path.getmtime(path)
+    ]
+    print(f"Found {len(files)} file(s) to import ({len(imported)} already imported)")
+
+    stats = {'files': 0, 'rows': 0, 'failed': 0}
+    batch = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path, mtime, rows, error in executor.map(lambda item: load_file(*item), files):
+            if error:
+                stats['failed'] += 1
+                print(f"❌ Skipped {path}: {error}")
+                continue
+
+            batch.append((path, mtime, rows))
+            if len(batch) >= batch_size:
+                stats['rows'] += write_batch(conn, batch)
+                stats['files'] += len(batch)
+                batch = []
+                elapsed = time.perf_counter() - started
+                print(f"Imported {stats['files']}/{len(files)} files ({stats['files'] / elapsed:.0f} files/s)")
+
+        if batch:
+            stats['rows'] += write_batch(conn, batch)
+            stats['files'] += len(batch)
+
+    stats['hashed'] = backfill_hashes(conn, photos_dir, max_pixels, batch_size, workers)
+    if enqueue:
+        stats['queued'] = enqueue_unverified(conn)
+    conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ Imported {stats['files']} file(s), {stats['rows']} row(s) written, {stats['failed']} failed "
+        f"in {elapsed:.2f}s ({stats['files'] / elapsed:.0f} files/s, {stats['rows'] / elapsed:.0f} rows/s)"
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import profiles/*.json and photos/*/metadata.json into the database")
+    parser.add_argument('--database', default=None, help="database path (default: database_path from config.json)")
+    parser.add_argument('--profiles', default='profiles', help="profiles directory")
+    parser.add_argument('--photos', default='photos', help="photos directory")
+    parser.add_argument('--batch-size', type=int, default=500, help="files per transaction")
+    parser.add_argument('--workers', type=int, default=8, help="threads reading JSON files")
+    parser.add_argument(
+        '--enqueue-unverified',
+        action='store_true',
+        help="add every unverified profile to /verifyqueue (this includes profiles that were rejected before the queue existed)"
+    )
+    args = parser.parse_args()
+    config = load_config()
+
+    migrate(
+        args.database or config["database_path"],
+        profiles_dir=args.profiles,
+        photos_dir=args.photos,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        max_pixels=config["max_image_pixels"],
+        enqueue=args.enqueue_unverified
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+import aiohttp
+import discord
+from fileutils import append_line, run_io
+from settings import load_config
+
+
+class Notifier:
+    """Queue of outbound DMs sent by background workers, so moderator actions never wait on Discord"""
+
+    def __init__(self, bot, rate=5, workers=2, retries=3, backoff=1.0, dead_letter_path=None):
+        self.bot = bot
+        self.interval = 1 / rate if rate else 0
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.dead_letter_path = dead_letter_path
+        self._queue = asyncio.Queue()
+        self._tasks = []
+        self._retry_handles = set()
+        self._rate_lock = asyncio.Lock()
+        self._next_send = 0
+        self.sent = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the worker tasks"""
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def close(self):
+        """Stop the workers, dropping anything still queued"""
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def send(self, user_id, embed):
+        """Queue a DM to a user"""
+        self._queue.put_nowait((int(user_id), embed, 0))
+
+    async def _wait_for_slot(self):
+        """Space sends out to the configured rate, shared by every worker"""
+        async with self._rate_lock:
+            delay = self._next_send - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_send = time.monotonic() + self.interval
+
+    def _pause(self, seconds):
+        """Hold back every worker after Discord rate limits us"""
+        self._next_send = max(self._next_send, time.monotonic() + seconds)
+
+    async def _deliver(self, user_id, embed):
+        """Send a DM, reusing the cached user and DM channel when there is one"""
+        user = self.bot.get_user(user_id) or discord.Object(id=user_id)
+        channel = await self.bot.create_dm(user)
+        await channel.send(embed=embed)
+
+    def _retry_delay(self, attempt, error):
+        """Exponential backoff with jitter, honouring Discord's retry_after"""
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            return retry_after
+        return self.backoff * (2 ** attempt) * (0.5 + random.random())
+
+    def _is_retryable(self, error):
+        if isinstance(error, (discord.RateLimited, aiohttp.ClientError, asyncio.TimeoutError)):
+            return True
+        return isinstance(error, discord.HTTPException) and (error.status == 429 or error.status >= 500)
+
+    def _schedule_retry(self, item, delay):
+        loop = asyncio.get_running_loop()
+
+        def _requeue():
+            self._retry_handles.discard(handle)
+            self._queue.put_nowait(item)
+
+        handle = loop.call_later(delay, _requeue)
+        self._retry_handles.add(handle)
+
+    async def _dead_letter(self, user_id, embed, attempt, error):
+        """Record a DM that could not be delivered"""
+        self.failed += 1
+        print(f"❌ Could not DM user {user_id} after {attempt + 1} attempt(s): {error}")
+        if not self.dead_letter_path:
+            return
+
+        entry = {
+            'user_id': user_id,
+            'title': embed.title,
+            'description': embed.description,
+            'attempts': attempt + 1,
+            'error': str(error),
+            'failed_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        try:
+            await run_io(append_line, self.dead_letter_path, json.dumps(entry))
+        except OSError as e:
+            print(f"❌ Could not write to {self.dead_letter_path}: {e}")
+
+    async def _worker(self):
+        while True:
+            user_id, embed, attempt = await self._queue.get()
+            try:
+                await self._wait_for_slot()
+                await self._deliver(user_id, embed)
+                self.sent += 1
+            except (discord.DiscordException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if self._is_retryable(e) and attempt < self.retries:
+                    delay = self._retry_delay(attempt, e)
+                    if getattr(e, 'retry_after', None):
+                        self._pause(delay)
+                    self._schedule_retry((user_id, embed, attempt + 1), delay)
+                else:
+                    await self._dead_letter(user_id, embed, attempt, e)
+            except Exception as e:
+                # Anything unexpected is a bug, not a Discord hiccup: record it and keep the worker alive
+                await self._dead_letter(user_id, embed, attempt, e)
+            finally:
+                self._queue.task_done()
+
+    def __len__(self):
+        return self._queue.qsize() + len(self._retry_handles)
+
+
+def get_notifier(bot):
+    """Get the notifier shared by all cogs, creating it on first use"""
+    if getattr(bot, 'notifier', None) is None:
+        config = load_config()
+        bot.notifier = Notifier(
+            bot,
+            rate=config["notification_rate"],
+            workers=config["notification_workers"],
+            retries=config["notification_retries"],
+            dead_letter_path=config["notification_dead_letter_path"]
+        )
+    return bot.notifier
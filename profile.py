@@ -6,32 +6,22 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
-import os
 import asyncio
 from datetime import datetime
+from settings import load_config
+from storage import get_store
+from notifications import get_notifier
+from rendering import ProfileRenderer
+from search import get_profile_index
 
 
-if not os.path.exists('profiles'):
-    os.makedirs('profiles')
-
-
-def load_config():
-    if os.path.exists('config.json'):
-        with open('config.json', 'r') as f:
-            return json.load(f)
-    else:
-        default_config = {
-            "profile_verification_channel_id": 1344388058770047006
-        }
-        with open('config.json', 'w') as f:
-            json.dump(default_config, f, indent=4)
-        return default_config
-
 class ProfileCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config = load_config()
+        self.store = get_store(bot)
+        self.notifier = get_notifier(bot)
+        self.profile_index = get_profile_index(bot)
         
         
         self.emoji = {
@@ -52,6 +42,7 @@ class ProfileCog(commands.Cog):
             "dot": "<:dot:1344650103386013727>",
             "folder": "<:folder:1344680932640161812>"
         }
+        self.renderer = ProfileRenderer(self.emoji, self.config["cache_size"], self.config["cache_ttl"])
 
     @app_commands.command(
         name="profile",
@@ -64,8 +55,7 @@ class ProfileCog(commands.Cog):
             await self.show_user_profile(interaction, user)
         else:
             
-            profile_path = f'profiles/{interaction.user.id}.json'
-            if os.path.exists(profile_path):
+            if await self.store.get_profile(interaction.user.id):
                 await self.show_user_profile(interaction, interaction.user)
             else:
                 
@@ -119,9 +109,9 @@ class ProfileCog(commands.Cog):
     
     async def show_user_profile(self, interaction, user):
         """Show a user's profile if it exists"""
-        profile_path = f'profiles/{user.id}.json'
+        profile = await self.store.get_profile(user.id)
         
-        if not os.path.exists(profile_path):
+        if not profile:
             if user == interaction.user:
                 
                 await interaction.response.send_message("You don't have a profile yet. Use `/profile` to set one up.", ephemeral=True)
@@ -130,66 +120,12 @@ class ProfileCog(commands.Cog):
             return
         
         
-        with open(profile_path, 'r') as f:
-            profile = json.load(f)
-        
-        
         if not profile.get("verified", False) and user != interaction.user and not interaction.user.guild_permissions.manage_messages:
             await interaction.response.send_message(f"{user.display_name}'s profile is pending verification.", ephemeral=True)
             return
         
         
-        embed = discord.Embed(
-            title=f"{self.emoji['camera']} {profile.get('display_name', user.display_name)}'s Photography Profile",
-            description=profile.get('bio', 'No bio provided.'),
-            color=discord.Color.dark_gray()
-        )
-        
-        
-        if profile.get('photography_type'):
-            embed.add_field(
-                name=f"{self.emoji['list']} Photography Type",
-                value=profile.get('photography_type', 'Not specified'),
-                inline=False
-            )
-        
-        
-        if profile.get('equipment'):
-            embed.add_field(
-                name=f"{self.emoji['pinned']} Equipment",
-                value=profile.get('equipment', 'Not specified'),
-                inline=False
-            )
-        
-        
-        socials = profile.get('socials', {})
-        social_text = ""
-        
-        if socials.get('instagram'):
-            social_text += f"{self.emoji['apps']} Instagram: [**@{socials['instagram']}**](https://instagram.com/{socials['instagram']})\n"
-        
-        if socials.get('twitter'):
-            social_text += f"{self.emoji['bird']} Twitter/X: [**@{socials['twitter']}**](https://twitter.com/{socials['twitter']})\n"
-        
-        if socials.get('flickr'):
-            social_text += f"{self.emoji['dot']} Flickr: [**{socials['flickr']}**](https://flickr.com/people/{socials['flickr']})\n"
-        
-        if socials.get('500px'):
-            social_text += f"{self.emoji['dot']} 500px: [**{socials['500px']}**](https://500px.com/{socials['500px']})\n"
-        
-        if socials.get('website'):
-            social_text += f"{self.emoji['globe']} Website: **{socials['website']}**\n"
-        
-        if social_text:
-            embed.add_field(name=f"{self.emoji['phone']} Social Links", value=social_text, inline=False)
-
-        
-        
-        status = f"{self.emoji['check']} Verified" if profile.get('verified', False) else f"{self.emoji['hourglass']} Pending Verification"
-        embed.add_field(name="Status", value=status, inline=True)
-        
-        
-        embed.set_footer(text=f"Profile created: {profile.get('created_at', 'Unknown')}")
+        embed = self.renderer.render(profile)
         
         
         view = None
@@ -213,151 +149,346 @@ class ProfileCog(commands.Cog):
     async def submit_profile_for_verification(self, user, profile_data):
         """Submit a profile for admin verification"""
         
-        profile_path = f'profiles/{user.id}.json'
-        with open(profile_path, 'w') as f:
-            json.dump(profile_data, f, indent=4)
-        
-        
         try:
-            channel_id = self.config["profile_verification_channel_id"]
-            channel = self.bot.get_channel(channel_id)
-            
-            if channel:
-                embed = discord.Embed(
-                    title=f"{self.emoji['hourglass']} Profile Verification Request",
-                    description=f"User: {user.mention} ({user.name})\nID: {user.id}",
-                    color=discord.Color.yellow()
-                )
-                
-                embed.add_field(
-                    name="Photography Type",
-                    value=profile_data.get('photography_type', 'Not specified'),
-                    inline=False
-                )
-                
-                embed.add_field(
-                    name="Bio",
-                    value=profile_data.get('bio', 'Not provided'),
-                    inline=False
-                )
-                
-                
-                socials = profile_data.get('socials', {})
-                social_text = ""
-                
-                if socials.get('instagram'):
-                    social_text += f"Instagram: @{socials['instagram']}\n"
-                if socials.get('twitter'):
-                    social_text += f"Twitter/X: @{socials['twitter']}\n"
-                if socials.get('flickr'):
-                    social_text += f"Flickr: {socials['flickr']}\n"
-                if socials.get('500px'):
-                    social_text += f"500px: {socials['500px']}\n"
-                if socials.get('website'):
-                    social_text += f"Website: {socials['website']}\n"
-                
-                if social_text:
-                    embed.add_field(name="Social Links", value=social_text, inline=False)
-                
-                
-                view = discord.ui.View()
-                approve_button = discord.ui.Button(
-                    label="Approve",
-                    style=discord.ButtonStyle.success,
-                    emoji=self.emoji['check'],
-                    custom_id=f"approve_profile:{user.id}"
-                )
-                reject_button = discord.ui.Button(
-                    label="Reject",
-                    style=discord.ButtonStyle.danger,
-                    emoji=self.emoji['denied'],
-                    custom_id=f"reject_profile:{user.id}"
-                )
-                
-                view.add_item(approve_button)
-                view.add_item(reject_button)
-                
-                await channel.send(embed=embed, view=view)
-                
-                return True
-            else:
-                print(f"Error: Could not find verification channel with ID {channel_id}")
-                return False
+            await self.store.submit_profile(profile_data)
         except Exception as e:
             print(f"Error submitting profile for verification: {e}")
             return False
-
-    @commands.Cog.listener()
-    async def on_interaction(self, interaction):
-        """Handle button interactions for profile verification"""
-        if not interaction.data or not interaction.data.get('custom_id'):
-            return
         
-        custom_id = interaction.data.get('custom_id')
+        self.renderer.invalidate(user.id)
+        self.profile_index.update(profile_data)
         
         
-        if custom_id.startswith("approve_profile:") or custom_id.startswith("reject_profile:"):
+        # The profile is queued now, so a failed post only costs moderators the channel message, not the submission
+        try:
+            channel_id = self.config["profile_verification_channel_id"]
             
-            if not interaction.user.guild_permissions.manage_messages:
-                await interaction.response.send_message("You don't have permission to verify profiles.", ephemeral=True)
-                return
+            # Only the process whose shards include the channel's guild has it cached; a partial messageable sends over REST from any process
+            channel = self.bot.get_channel(channel_id) or self.bot.get_partial_messageable(channel_id)
+            embed = self.renderer.render(profile_data, 'moderator')
             
-            user_id = int(custom_id.split(":")[-1])
-            profile_path = f'profiles/{user_id}.json'
             
-            if not os.path.exists(profile_path):
-                await interaction.response.send_message("This profile no longer exists.", ephemeral=True)
-                return
+            view = discord.ui.View(timeout=None)
+            view.add_item(VerificationButton("approve", user.id, emoji=self.emoji['check']))
+            view.add_item(VerificationButton("reject", user.id, emoji=self.emoji['denied']))
             
-            with open(profile_path, 'r') as f:
-                profile_data = json.load(f)
+            await channel.send(embed=embed, view=view)
+        except Exception as e:
+            print(f"Error posting profile {user.id} to the verification channel, it is still in /verifyqueue: {e}")
+        
+        return True
+
+    async def cog_load(self):
+        self.bot.add_dynamic_items(VerificationButton)
+        self.notifier.start()
+        self.profile_index.start()
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(VerificationButton)
+        await self.notifier.close()
+
+    @app_commands.command(
+        name="verifyqueue",
+        description="Review profiles waiting for verification"
+    )
+    @app_commands.guild_only()
+    @app_commands.default_permissions(manage_messages=True)
+    async def verifyqueue(self, interaction: discord.Interaction):
+        """Show the verification queue dashboard to a moderator"""
+        if not interaction.user.guild_permissions.manage_messages:
+            await interaction.response.send_message("You don't have permission to verify profiles.", ephemeral=True)
+            return
+        
+        view = VerificationQueueView(self, interaction.user)
+        await view.load()
+        await interaction.response.send_message(embed=view.get_embed(), view=view, ephemeral=True)
+    
+    @app_commands.command(
+        name="search",
+        description="Search photographers by specialty, equipment, bio or socials"
+    )
+    async def search(self, interaction: discord.Interaction, query: str):
+        """Search profiles, showing unverified ones only to moderators"""
+        moderator = isinstance(interaction.user, discord.Member) and interaction.user.guild_permissions.manage_messages
+        
+        view = SearchResultsView(self, interaction.user, query, moderator)
+        await view.load()
+        await interaction.response.send_message(embed=view.get_embed(), view=view, ephemeral=True)
+    
+    def verification_dm(self, approved):
+        """Build the DM sent to a user when their profile is approved or rejected"""
+        if approved:
+            return discord.Embed(
+                title=f"{self.emoji['check']} Profile Approved",
+                description="Your photography profile has been verified and is now visible to other users!",
+                color=discord.Color.green()
+            )
+        return discord.Embed(
+            title=f"{self.emoji['denied']} Profile Needs Revision",
+            description="Your photography profile was not approved. Please use `/profile` to edit your profile and submit it again.",
+            color=discord.Color.red()
+        )
+    
+    async def resolve_profiles(self, user_ids, approved):
+        """Approve or reject profiles in one write and queue a DM to each user, returning the profiles resolved"""
+        profiles = await self.store.resolve_verifications(user_ids, approved)
+        
+        embed = self.verification_dm(approved)
+        for profile_data in profiles:
+            self.renderer.invalidate(profile_data['user_id'])
+            self.profile_index.update(profile_data)
+            self.notifier.send(profile_data['user_id'], embed)
+        
+        return profiles
+    
+    async def handle_verification(self, interaction, action, user_id):
+        """Approve or reject a profile from the verification channel"""
+        if not interaction.user.guild_permissions.manage_messages:
+            await interaction.response.send_message("You don't have permission to verify profiles.", ephemeral=True)
+            return
+        
+        if not await self.resolve_profiles([user_id], action == "approve"):
+            await interaction.response.send_message("This profile no longer exists.", ephemeral=True)
+            return
+        
+        if action == "approve":
+            await interaction.response.send_message(f"Profile for <@{user_id}> has been approved!", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"Profile for <@{user_id}> has been rejected.", ephemeral=True)
+        
+        
+        try:
+            embed = interaction.message.embeds[0]
+            status = "Approved" if action == "approve" else "Rejected"
+            embed.title = f"{self.emoji['check'] if status == 'Approved' else self.emoji['denied']} Profile {status}"
+            embed.color = discord.Color.green() if status == "Approved" else discord.Color.red()
+            
+            await interaction.message.edit(embed=embed, view=None)
+        except (IndexError, discord.HTTPException) as e:
+            print(f"❌ Could not update verification message for {user_id}: {e}")
+
+
+class VerificationButton(discord.ui.DynamicItem[discord.ui.Button], template=r'(?P<action>approve|reject)_profile:(?P<user_id>[0-9]+)'):
+    """Persistent approve/reject button, routed by custom_id so it keeps working after a restart"""
+
+    def __init__(self, action, user_id, emoji=None):
+        super().__init__(
+            discord.ui.Button(
+                label="Approve" if action == "approve" else "Reject",
+                style=discord.ButtonStyle.success if action == "approve" else discord.ButtonStyle.danger,
+                emoji=emoji,
+                custom_id=f"{action}_profile:{user_id}"
+            )
+        )
+        self.action = action
+        self.user_id = user_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match['action'], int(match['user_id']), emoji=item.emoji)
+
+    async def callback(self, interaction):
+        cog = interaction.client.get_cog('ProfileCog')
+        if cog is None:
+            await interaction.response.send_message("Profile verification is unavailable right now.", ephemeral=True)
+            return
+        await cog.handle_verification(interaction, self.action, self.user_id)
+
+
+class VerificationQueueView(discord.ui.View):
+    def __init__(self, cog, user, page_size=25):
+        super().__init__(timeout=900)
+        self.cog = cog
+        self.user = user
+        self.page_size = page_size
+        self.page = 0
+        self.profiles = []
+        self.total = 0
+        self.selected = set()
+    
+    @property
+    def total_pages(self):
+        return max(1, -(-self.total // self.page_size))
+    
+    async def load(self):
+        """Load the current page of pending profiles"""
+        self.profiles, self.total = await self.cog.store.get_pending_profiles(self.page * self.page_size, self.page_size)
+        if not self.profiles and self.page > 0:
+            self.page = self.total_pages - 1
+            self.profiles, self.total = await self.cog.store.get_pending_profiles(self.page * self.page_size, self.page_size)
+        
+        self.selected = set()
+        self.update_items()
+    
+    def get_embed(self):
+        """Return the embed listing the current page"""
+        embed = discord.Embed(
+            title=f"{self.cog.emoji['hourglass']} Verification Queue ({self.total} pending)",
+            color=discord.Color.yellow()
+        )
+        
+        if not self.profiles:
+            embed.description = "No profiles are waiting for verification."
+            return embed
+        
+        lines = []
+        for number, profile in enumerate(self.profiles, start=self.page * self.page_size + 1):
+            photography_type = profile.get('photography_type') or 'Not specified'
+            lines.append(f"**{number}.** <@{profile['user_id']}> - {photography_type[:60]} ({profile['submitted_at']})")
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"Page {self.page + 1}/{self.total_pages}")
+        return embed
+    
+    def update_items(self):
+        """Rebuild the select menu and buttons for the current page"""
+        self.clear_items()
+        
+        if self.profiles:
+            options = [
+                discord.SelectOption(
+                    label=(profile.get('display_name') or profile.get('username') or str(profile['user_id']))[:100],
+                    value=str(profile['user_id']),
+                    description=(profile.get('photography_type') or 'Not specified')[:100],
+                    default=profile['user_id'] in self.selected
+                )
+                for profile in self.profiles
+            ]
+            select = discord.ui.Select(
+                placeholder="Select profiles...",
+                min_values=0,
+                max_values=len(options),
+                options=options,
+                row=0
+            )
             
-            if custom_id.startswith("approve_profile:"):
-                profile_data["verified"] = True
-                with open(profile_path, 'w') as f:
-                    json.dump(profile_data, f, indent=4)
-                
-                await interaction.response.send_message(f"Profile for <@{user_id}> has been approved!", ephemeral=True)
-                
-                
-                try:
-                    user = await self.bot.fetch_user(user_id)
-                    if user:
-                        embed = discord.Embed(
-                            title=f"{self.emoji['check']} Profile Approved",
-                            description="Your photography profile has been verified and is now visible to other users!",
-                            color=discord.Color.green()
-                        )
-                        await user.send(embed=embed)
-                except:
-                    pass
-                
-            elif custom_id.startswith("reject_profile:"):
-                await interaction.response.send_message(f"Profile for <@{user_id}> has been rejected.", ephemeral=True)
-                
-                
-                try:
-                    user = await self.bot.fetch_user(user_id)
-                    if user:
-                        embed = discord.Embed(
-                            title=f"{self.emoji['denied']} Profile Needs Revision",
-                            description="Your photography profile was not approved. Please use `/profile` to edit your profile and submit it again.",
-                            color=discord.Color.red()
-                        )
-                        await user.send(embed=embed)
-                except:
-                    pass
-            
-            
-            try:
-                embed = interaction.message.embeds[0]
-                status = "Approved" if custom_id.startswith("approve_profile:") else "Rejected"
-                embed.title = f"{self.emoji['check'] if status == 'Approved' else self.emoji['denied']} Profile {status}"
-                embed.color = discord.Color.green() if status == "Approved" else discord.Color.red()
-                
-                await interaction.message.edit(embed=embed, view=None)
-            except:
-                pass
+            async def select_callback(interaction):
+                self.selected = {int(value) for value in select.values}
+                self.update_items()
+                await interaction.response.edit_message(view=self)
+            
+            select.callback = select_callback
+            self.add_item(select)
+        
+        buttons = [
+            ("Approve Selected", discord.ButtonStyle.success, self.cog.emoji['check'], not self.selected, self.approve_selected),
+            ("Reject Selected", discord.ButtonStyle.danger, self.cog.emoji['denied'], not self.selected, self.reject_selected),
+            ("Approve Page", discord.ButtonStyle.primary, self.cog.emoji['check'], not self.profiles, self.approve_page),
+            ("Previous", discord.ButtonStyle.secondary, self.cog.emoji['arrowleft'], self.page == 0, self.prev_page),
+            ("Next", discord.ButtonStyle.secondary, self.cog.emoji['arrowright'], self.page >= self.total_pages - 1, self.next_page)
+        ]
+        for label, style, emoji, disabled, callback in buttons:
+            button = discord.ui.Button(label=label, style=style, emoji=emoji, disabled=disabled, row=1)
+            button.callback = callback
+            self.add_item(button)
+    
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.user.id:
+            await interaction.response.send_message("This isn't your verification queue.", ephemeral=True)
+            return False
+        return True
+    
+    async def refresh(self, interaction, message=None):
+        """Reload the page and redraw the dashboard"""
+        await self.load()
+        await interaction.response.edit_message(content=message, embed=self.get_embed(), view=self)
+    
+    async def resolve(self, interaction, user_ids, approved):
+        """Approve or reject profiles and redraw the dashboard"""
+        profiles = await self.cog.resolve_profiles(user_ids, approved)
+        action = "Approved" if approved else "Rejected"
+        await self.refresh(interaction, f"{action} {len(profiles)} profile(s).")
+    
+    async def approve_selected(self, interaction):
+        await self.resolve(interaction, self.selected, True)
+    
+    async def reject_selected(self, interaction):
+        await self.resolve(interaction, self.selected, False)
+    
+    async def approve_page(self, interaction):
+        await self.resolve(interaction, [profile['user_id'] for profile in self.profiles], True)
+    
+    async def prev_page(self, interaction):
+        self.page = max(0, self.page - 1)
+        await self.refresh(interaction)
+    
+    async def next_page(self, interaction):
+        self.page = min(self.total_pages - 1, self.page + 1)
+        await self.refresh(interaction)
+
+
+class SearchResultsView(discord.ui.View):
+    def __init__(self, cog, user, query, include_unverified=False, page_size=10):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.user = user
+        self.query = query
+        self.include_unverified = include_unverified
+        self.page_size = page_size
+        self.page = 0
+        self.results = []
+        self.total = 0
+    
+    @property
+    def total_pages(self):
+        return max(1, -(-self.total // self.page_size))
+    
+    async def load(self):
+        """Run the search for the current page and load those profiles"""
+        matches, self.total = await self.cog.profile_index.search(
+            self.query,
+            include_unverified=self.include_unverified,
+            offset=self.page * self.page_size,
+            limit=self.page_size
+        )
+        profiles = await self.cog.store.get_profiles([user_id for _, user_id in matches])
+        self.results = [profiles[user_id] for _, user_id in matches if user_id in profiles]
+        
+        self.update_buttons()
+    
+    def get_embed(self):
+        """Return the embed listing the current page of results"""
+        embed = discord.Embed(
+            title=f"{self.cog.emoji['camera']} Photographers matching \"{self.query[:100]}\"",
+            color=discord.Color.dark_gray()
+        )
+        
+        if not self.results:
+            embed.description = "No profiles match your search."
+            return embed
+        
+        lines = []
+        for number, profile in enumerate(self.results, start=self.page * self.page_size + 1):
+            name = profile.get('display_name') or profile.get('username')
+            photography_type = profile.get('photography_type') or 'Not specified'
+            status = "" if profile.get('verified', False) else f" {self.cog.emoji['hourglass']}"
+            lines.append(f"**{number}.** {name} (<@{profile['user_id']}>){status}\n{self.cog.emoji['list']} {photography_type[:100]}")
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"{self.total} results - page {self.page + 1}/{self.total_pages}")
+        return embed
+    
+    def update_buttons(self):
+        """Add page buttons when there is more than one page"""
+        self.clear_items()
+        if self.total_pages <= 1:
+            return
+        
+        prev_button = discord.ui.Button(label="Previous", style=discord.ButtonStyle.secondary, emoji=self.cog.emoji['arrowleft'], disabled=self.page == 0)
+        prev_button.callback = self.prev_page
+        self.add_item(prev_button)
+        
+        next_button = discord.ui.Button(label="Next", style=discord.ButtonStyle.secondary, emoji=self.cog.emoji['arrowright'], disabled=self.page >= self.total_pages - 1)
+        next_button.callback = self.next_page
+        self.add_item(next_button)
+    
+    async def prev_page(self, interaction):
+        self.page = max(0, self.page - 1)
+        await self.load()
+        await interaction.response.edit_message(embed=self.get_embed(), view=self)
+    
+    async def next_page(self, interaction):
+        self.page = min(self.total_pages - 1, self.page + 1)
+        await self.load()
+        await interaction.response.edit_message(embed=self.get_embed(), view=self)
 
 
 class ProfileSetupView(discord.ui.View):
@@ -411,7 +542,7 @@ class ProfileSetupView(discord.ui.View):
             embed.add_field(
                 name="Disclaimer",
                 value=(
-                    "**-
+                    "**- We are not responsible "
                     "for any unsolicited messages you might receive. Exercise caution when sharing personal information.**"
                 ),
                 inline=False
@@ -0,0 +1,118 @@
+import discord
+from cache import MISSING, LRUCache
+
+
+class ProfileRenderer:
+    """Builds profile embeds once per profile version and viewer role, and serves copies of them"""
+
+    def __init__(self, emoji, cache_size=1024, cache_ttl=300):
+        self.emoji = emoji
+        self.cache = LRUCache(cache_size, cache_ttl)
+
+    def render(self, profile, role='public'):
+        """Get the embed for a profile as seen by 'public' viewers or by 'moderator' reviewers"""
+        user_id = int(profile['user_id'])
+        version = (profile.get('updated_at'), bool(profile.get('verified', False)))
+
+        entry = self.cache.get(user_id)
+        if entry is MISSING or entry[0] != version:
+            entry = (version, {})
+
+        payload = entry[1].get(role)
+        if payload is None:
+            builder = self._build_moderator if role == 'moderator' else self._build_public
+            payload = entry[1][role] = builder(profile).to_dict()
+            self.cache.set(user_id, entry)
+
+        # The cache copies values in and out, so payload is never shared with another caller
+        return discord.Embed.from_dict(payload)
+
+    def invalidate(self, user_id):
+        """Drop every cached embed for a user after their profile changes"""
+        self.cache.invalidate(int(user_id))
+
+    def _build_public(self, profile):
+        embed = discord.Embed(
+            title=f"{self.emoji['camera']} {profile.get('display_name') or profile.get('username')}'s Photography Profile",
+            description=profile.get('bio', 'No bio provided.'),
+            color=discord.Color.dark_gray()
+        )
+
+        if profile.get('photography_type'):
+            embed.add_field(
+                name=f"{self.emoji['list']} Photography Type",
+                value=profile.get('photography_type', 'Not specified'),
+                inline=False
+            )
+
+        if profile.get('equipment'):
+            embed.add_field(
+                name=f"{self.emoji['pinned']} Equipment",
+                value=profile.get('equipment', 'Not specified'),
+                inline=False
+            )
+
+        socials = profile.get('socials', {})
+        social_text = ""
+
+        if socials.get('instagram'):
+            social_text += f"{self.emoji['apps']} Instagram: [**@{socials['instagram']}**](https://instagram.com/{socials['instagram']})\n"
+
+        if socials.get('twitter'):
+            social_text += f"{self.emoji['bird']} Twitter/X: [**@{socials['twitter']}**](https://twitter.com/{socials['twitter']})\n"
+
+        if socials.get('flickr'):
+            social_text += f"{self.emoji['dot']} Flickr: [**{socials['flickr']}**](https://flickr.com/people/{socials['flickr']})\n"
+
+        if socials.get('500px'):
+            social_text += f"{self.emoji['dot']} 500px: [**{socials['500px']}**](https://500px.com/{socials['500px']})\n"
+
+        if socials.get('website'):
+            social_text += f"{self.emoji['globe']} Website: **{socials['website']}**\n"
+
+        if social_text:
+            embed.add_field(name=f"{self.emoji['phone']} Social Links", value=social_text, inline=False)
+
+        status = f"{self.emoji['check']} Verified" if profile.get('verified', False) else f"{self.emoji['hourglass']} Pending Verification"
+        embed.add_field(name="Status", value=status, inline=True)
+
+        embed.set_footer(text=f"Profile created: {profile.get('created_at', 'Unknown')}")
+        return embed
+
+    def _build_moderator(self, profile):
+        embed = discord.Embed(
+            title=f"{self.emoji['hourglass']} Profile Verification Request",
+            description=f"User: <@{profile['user_id']}> ({profile.get('username')})\nID: {profile['user_id']}",
+            color=discord.Color.yellow()
+        )
+
+        embed.add_field(
+            name="Photography Type",
+            value=profile.get('photography_type', 'Not specified'),
+            inline=False
+        )
+
+        embed.add_field(
+            name="Bio",
+            value=profile.get('bio', 'Not provided'),
+            inline=False
+        )
+
+        socials = profile.get('socials', {})
+        social_text = ""
+
+        if socials.get('instagram'):
+            social_text += f"Instagram: @{socials['instagram']}\n"
+        if socials.get('twitter'):
+            social_text += f"Twitter/X: @{socials['twitter']}\n"
+        if socials.get('flickr'):
+            social_text += f"Flickr: {socials['flickr']}\n"
+        if socials.get('500px'):
+            social_text += f"500px: {socials['500px']}\n"
+        if socials.get('website'):
+            social_text += f"Website: {socials['website']}\n"
+
+        if social_text:
+            embed.add_field(name="Social Links", value=social_text, inline=False)
+
+        return embed
@@ -0,0 +1,183 @@
+import asyncio
+import heapq
+import math
+import re
+import time
+from bisect import bisect_left
+from storage import get_store
+
+
+FIELD_WEIGHTS = {
+    'photography_type': 3.0,
+    'equipment': 2.0,
+    'display_name': 2.0,
+    'bio': 1.0,
+    'socials': 1.0
+}
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def profile_terms(profile):
+    """Get each term in a profile's searchable fields, weighted by the field it appears in"""
+    terms = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        value = profile.get(field) or ''
+        if isinstance(value, dict):
+            value = ' '.join(str(item) for item in value.values() if item)
+
+        for token in tokenize(str(value)):
+            terms[token] = terms.get(token, 0) + weight
+    return terms
+
+
+class ProfileIndex:
+    """In-memory inverted index over profile fields, ranked by field-weighted TF-IDF"""
+
+    def __init__(self, store, refresh_interval=5, batch_size=1000):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self._postings = {}
+        self._docs = {}
+        self._vocabulary = None
+        self._revision = None
+        self._refreshed_at = 0
+        self._task = None
+
+    def update(self, profile):
+        """Index a profile, replacing whatever was indexed for that user before"""
+        self._add(self._postings, self._docs, profile)
+        self._vocabulary = None
+
+    def _add(self, postings, docs, profile):
+        user_id = int(profile['user_id'])
+        self._remove(postings, docs, user_id)
+
+        terms = profile_terms(profile)
+        docs[user_id] = (terms, bool(profile.get('verified', False)), math.sqrt(sum(terms.values())) or 1.0)
+        for term, weight in terms.items():
+            postings.setdefault(term, {})[user_id] = weight
+
+    def _remove(self, postings, docs, user_id):
+        doc = docs.pop(user_id, None)
+        if doc is None:
+            return
+
+        for term in doc[0]:
+            users = postings.get(term)
+            if users is not None:
+                users.pop(user_id, None)
+                if not users:
+                    del postings[term]
+
+    def start(self):
+        """Build the index in the background, or top it up if it is already built, unless that is already running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._build() if self._revision is None else self._refresh())
+            self._task.add_done_callback(self._report)
+
+    def _report(self, task):
+        if not task.cancelled() and task.exception():
+            print(f"❌ Failed to update the profile search index: {task.exception()}")
+
+    async def _build(self):
+        """Index every profile in batches, then swap the new index in and apply anything written meanwhile"""
+        revision = await self.store.get_profile_revision()
+        postings = {}
+        docs = {}
+        after_id = 0
+        while True:
+            profiles = await self.store.get_profiles_after(after_id, self.batch_size)
+            for profile in profiles:
+                self._add(postings, docs, profile)
+            if len(profiles) < self.batch_size:
+                break
+            after_id = profiles[-1]['user_id']
+
+        self._postings = postings
+        self._docs = docs
+        self._vocabulary = None
+        self._revision = revision
+        await self._refresh()
+
+    async def _refresh(self):
+        """Re-index only the profiles written since the last build or refresh, including by other processes"""
+        while True:
+            changes = await self.store.get_profiles_changed_after(self._revision, self.batch_size)
+            for revision, profile in changes:
+                self.update(profile)
+                self._revision = revision
+            if len(changes) < self.batch_size:
+                break
+
+        self._refreshed_at = time.monotonic()
+
+    async def _ensure_built(self):
+        """Wait for the first build; after that, serve the current index and refresh it in the background"""
+        if self._revision is None:
+            self.start()
+            await asyncio.shield(self._task)
+        elif time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            self.start()
+
+    def _expand(self, token):
+        """Get every indexed term starting with token"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+
+        terms = []
+        index = bisect_left(self._vocabulary, token)
+        while index < len(self._vocabulary) and self._vocabulary[index].startswith(token):
+            terms.append(self._vocabulary[index])
+            index += 1
+        return terms
+
+    async def search(self, query, include_unverified=False, offset=0, limit=10):
+        """Get a page of (score, user_id) for profiles matching query, best first, and how many match; the last word also matches as a prefix"""
+        await self._ensure_built()
+
+        tokens = list(dict.fromkeys(tokenize(query)))
+        scores = {}
+        total_docs = len(self._docs) or 1
+        for position, token in enumerate(tokens):
+            if position == len(tokens) - 1:
+                terms = self._expand(token)
+            else:
+                terms = [token] if token in self._postings else []
+
+            token_scores = {}
+            for term in terms:
+                users = self._postings[term]
+                idf = math.log(1 + total_docs / len(users))
+                if term != token:
+                    idf *= 0.5
+
+                for user_id, weight in users.items():
+                    score = idf * weight / self._docs[user_id][2]
+                    if score > token_scores.get(user_id, 0):
+                        token_scores[user_id] = score
+
+            for user_id, score in token_scores.items():
+                scores[user_id] = scores.get(user_id, 0) + score
+
+        if not include_unverified:
+            scores = {user_id: score for user_id, score in scores.items() if self._docs[user_id][1]}
+
+        top = heapq.nsmallest(offset + limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, user_id) for user_id, score in top[offset:]], len(scores)
+
+    def __len__(self):
+        return len(self._docs)
+
+
+def get_profile_index(bot):
+    """Get the profile search index shared by all cogs, creating it on first use"""
+    if getattr(bot, 'profile_index', None) is None:
+        bot.profile_index = ProfileIndex(get_store(bot))
+    return bot.profile_index
@@ -0,0 +1,64 @@
+import json
+import os
+from fileutils import write_atomic
+
+
+DEFAULT_CONFIG = {
+    "profile_verification_channel_id": 1344388058770047006,
+    "image_workers": 0,
+    "image_queue_size": 8,
+    "image_queue_timeout": 30,
+    "http_connections": 100,
+    "http_connections_per_host": 10,
+    "http_timeout": 30,
+    "http_retries": 3,
+    "http_max_backoff": 30,
+    "max_upload_bytes": 50 * 1024 * 1024,
+    "max_image_pixels": 100_000_000,
+    "photo_base_url": "",
+    "image_format": "webp",
+    "database_path": "photographyprofiler.db",
+    "database_busy_timeout": 30,
+    "cache_size": 1024,
+    "cache_ttl": 300,
+    "cache_check_interval": 1,
+    "notification_rate": 5,
+    "notification_workers": 2,
+    "notification_retries": 3,
+    "notification_dead_letter_path": "notifications_dead_letter.jsonl",
+    "similar_max_distance": 10,
+    "duplicate_max_distance": 6,
+    "batch_upload_limit": 10,
+    "upload_concurrency": 5
+}
+
+IMAGE_FORMATS = {
+    'WEBP': 'WEBP',
+    'JPEG': 'JPEG',
+    'JPG': 'JPEG',
+    'PNG': 'PNG'
+}
+
+
+def normalize_image_format(value):
+    """Map an image_format setting such as "webp" or "jpg" to its Pillow format name"""
+    image_format = IMAGE_FORMATS.get(str(value).strip().upper())
+    if image_format is None:
+        raise ValueError(f"Invalid image_format {value!r} in config.json, expected webp, jpeg (or jpg) or png")
+    return image_format
+
+
+def load_config():
+    """Load config.json, filling in defaults for any missing keys and checking the ones that must be valid"""
+    if os.path.exists('config.json'):
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    else:
+        config = {
+            "profile_verification_channel_id": DEFAULT_CONFIG["profile_verification_channel_id"]
+        }
+        write_atomic('config.json', json.dumps(config, indent=4).encode())
+
+    config = {**DEFAULT_CONFIG, **config}
+    config["image_format"] = normalize_image_format(config["image_format"])
+    return config
@@ -0,0 +1,104 @@
+import asyncio
+from itertools import combinations
+from storage import get_store
+
+
+def hamming(a, b):
+    """Count the bits that differ between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+class HammingIndex:
+    """Multi-index hashing: hashes within distance d differ by at most d // chunks bits in some chunk, so only nearby chunk values are looked up"""
+
+    def __init__(self, bits=64, chunks=4):
+        self.chunks = chunks
+        self.chunk_bits = bits // chunks
+        self.mask = (1 << self.chunk_bits) - 1
+        self.tables = [{} for _ in range(chunks)]
+        self.size = 0
+        self._flips = {}
+
+    def _split(self, value):
+        return [(value >> (i * self.chunk_bits)) & self.mask for i in range(self.chunks)]
+
+    def _flip_masks(self, radius):
+        """Every chunk-sized mask with at most radius bits set"""
+        if radius not in self._flips:
+            self._flips[radius] = [
+                sum(1 << bit for bit in bits)
+                for count in range(radius + 1)
+                for bits in combinations(range(self.chunk_bits), count)
+            ]
+        return self._flips[radius]
+
+    def add(self, value, item):
+        """Add an item under a hash"""
+        entry = (value, item)
+        for table, key in zip(self.tables, self._split(value)):
+            table.setdefault(key, []).append(entry)
+        self.size += 1
+
+    def search(self, value, max_distance):
+        """Get (distance, item) for every item within max_distance of value"""
+        flips = self._flip_masks(max_distance // self.chunks)
+        seen = set()
+        results = []
+
+        for table, key in zip(self.tables, self._split(value)):
+            for flip in flips:
+                for entry_value, item in table.get(key ^ flip, ()):
+                    if item in seen:
+                        continue
+                    seen.add(item)
+
+                    distance = hamming(value, entry_value)
+                    if distance <= max_distance:
+                        results.append((distance, item))
+
+        return results
+
+    def __len__(self):
+        return self.size
+
+
+class SimilarityIndex:
+    """In-memory index of every photo's perceptual hash, topped up from the store before each search"""
+
+    def __init__(self, store, batch_size=5000):
+        self.store = store
+        self.batch_size = batch_size
+        self.index = HammingIndex()
+        self._last_id = 0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self):
+        """Add hashes for photos stored since the last refresh, including ones added by other processes"""
+        async with self._lock:
+            while True:
+                rows = await self.store.get_photo_hashes_after(self._last_id, self.batch_size)
+                for photo_id, user_id, image_hash in rows:
+                    self.index.add(int(image_hash, 16), (photo_id, user_id))
+                    self._last_id = photo_id
+
+                if len(rows) < self.batch_size:
+                    return
+
+    async def search(self, image_hash, max_distance=10, limit=10, user_id=None, exclude=()):
+        """Get the closest photos to a hash as (distance, photo_id, user_id), nearest first"""
+        await self.refresh()
+
+        matches = [
+            (distance, photo_id, owner_id)
+            for distance, (photo_id, owner_id) in self.index.search(int(image_hash, 16), max_distance)
+            if photo_id not in exclude and (user_id is None or owner_id == int(user_id))
+        ]
+        matches.sort()
+        return matches[:limit]
+
+
+def get_similarity_index(bot):
+    """Get the similarity index shared by all cogs, creating it on first use"""
+    if getattr(bot, 'similarity', None) is None:
+        bot.similarity = SimilarityIndex(get_store(bot))
+    return bot.similarity
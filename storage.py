@@ -0,0 +1,635 @@
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from cache import MISSING, LRUCache
+from settings import load_config
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id INTEGER PRIMARY KEY,
+    verified INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    data TEXT NOT NULL,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS photo_users (
+    user_id INTEGER PRIMARY KEY,
+    agreed_to_terms INTEGER NOT NULL DEFAULT 0,
+    agreed_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS folders (
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (user_id, name)
+);
+
+CREATE TABLE IF NOT EXISTS photos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    folder TEXT NOT NULL COLLATE NOCASE,
+    filename TEXT NOT NULL,
+    uploaded_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    renditions TEXT NOT NULL,
+    dhash TEXT,
+    exif TEXT
+);
+
+CREATE TABLE IF NOT EXISTS photo_hashes (
+    photo_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    dhash TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS photo_exif (
+    photo_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    camera TEXT COLLATE NOCASE,
+    lens TEXT COLLATE NOCASE,
+    focal_length REAL,
+    focal_length_35mm INTEGER,
+    iso INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS verification_queue (
+    user_id INTEGER PRIMARY KEY,
+    submitted_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_profiles_verified ON profiles (verified);
+CREATE INDEX IF NOT EXISTS idx_photos_user_folder ON photos (user_id, folder, id);
+DROP INDEX IF EXISTS idx_photos_user_filename;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_photos_user_folder_filename ON photos (user_id, folder, filename);
+CREATE INDEX IF NOT EXISTS idx_photo_exif_camera ON photo_exif (camera, photo_id);
+CREATE INDEX IF NOT EXISTS idx_photo_exif_lens ON photo_exif (lens, photo_id);
+CREATE INDEX IF NOT EXISTS idx_photo_exif_focal_length ON photo_exif (focal_length, photo_id);
+CREATE INDEX IF NOT EXISTS idx_photo_exif_focal_length_35mm ON photo_exif (focal_length_35mm, photo_id);
+CREATE INDEX IF NOT EXISTS idx_verification_queue_submitted ON verification_queue (submitted_at, user_id);
+"""
+
+# Columns added to existing tables after they were first released, as (table, column, definition)
+ADDED_COLUMNS = [
+    ('blobs', 'dhash', 'TEXT'),
+    ('blobs', 'exif', 'TEXT'),
+    ('profiles', 'revision', 'INTEGER NOT NULL DEFAULT 0')
+]
+
+# Indexes on added columns, created once the columns exist
+ADDED_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_profiles_revision ON profiles(revision);
+"""
+
+# Every profile write takes the next revision; writes are serialised, so revisions commit in order
+NEXT_PROFILE_REVISION = "(SELECT COALESCE(MAX(revision), 0) + 1 FROM profiles)"
+
+
+def upgrade_schema(conn):
+    """Create missing tables and add any columns an older database is missing"""
+    conn.executescript(SCHEMA)
+    for table, column, definition in ADDED_COLUMNS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    conn.executescript(ADDED_INDEXES)
+
+
+class BlobMissing(Exception):
+    """Raised when a photo references a blob record that has been removed"""
+
+
+class Store:
+    """SQLite storage for profiles, folders and photos, run on a dedicated thread"""
+
+    def __init__(self, path, cache_size=1024, cache_ttl=300, busy_timeout=30, cache_check_interval=1):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cache_check_interval = cache_check_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='store')
+        self._conn = None
+        self._data_version = None
+        self._last_version_check = 0
+        self.caches = {
+            'profiles': LRUCache(cache_size, cache_ttl),
+            'terms': LRUCache(cache_size, cache_ttl),
+            'folders': LRUCache(cache_size, cache_ttl),
+            'photos': LRUCache(cache_size, cache_ttl)
+        }
+
+    def _connect(self):
+        """Open the connection on the store thread and create the schema"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            upgrade_schema(conn)
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, func, *args):
+        """Run func(conn, *args) on the store thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(self._connect(), *args))
+
+    async def _write(self, func):
+        """Run func(conn) on the store thread inside a BEGIN IMMEDIATE transaction"""
+        def _transaction(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+        return await self._run(_transaction)
+
+    async def _check_external_writes(self):
+        """Clear the caches if another process (another shard, migrate.py) has committed since the last check"""
+        now = time.monotonic()
+        if now - self._last_version_check < self.cache_check_interval:
+            return
+        self._last_version_check = now
+
+        version = await self._run(lambda conn: conn.execute("PRAGMA data_version").fetchone()[0])
+        if self._data_version is not None and version != self._data_version:
+            for cache in self.caches.values():
+                cache.clear()
+        self._data_version = version
+
+    async def _cached(self, cache_name, key, func):
+        """Serve a read from cache, falling back to func(conn) on the store thread"""
+        await self._check_external_writes()
+        cache = self.caches[cache_name]
+        value = cache.get(key)
+        if value is not MISSING:
+            return value
+
+        token = cache.token()
+        value = await self._run(func)
+        cache.fill(key, value, token)
+        return value
+
+    def cache_stats(self):
+        """Get hit/miss counters for every cache"""
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+    def close(self):
+        """Close the connection and stop the store thread"""
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        self._executor.submit(_close).result()
+        self._executor.shutdown()
+
+    async def get_profile(self, user_id):
+        """Get a user's profile, or None if they don't have one"""
+        def _get(conn):
+            row = conn.execute("SELECT data FROM profiles WHERE user_id = ?", (int(user_id),)).fetchone()
+            return json.loads(row['data']) if row else None
+
+        return await self._cached('profiles', int(user_id), _get)
+
+    async def get_profiles(self, user_ids):
+        """Get several users' profiles, as {user_id: profile} for those that have one"""
+        user_ids = [int(user_id) for user_id in user_ids]
+
+        def _get(conn):
+            placeholders = ", ".join("?" * len(user_ids))
+            rows = conn.execute(f"SELECT user_id, data FROM profiles WHERE user_id IN ({placeholders})", user_ids)
+            return {row['user_id']: json.loads(row['data']) for row in rows}
+
+        if not user_ids:
+            return {}
+        return await self._run(_get)
+
+    def _save_profile(self, conn, profile_data):
+        conn.execute(
+            f"INSERT OR REPLACE INTO profiles (user_id, verified, updated_at, data, revision) VALUES (?, ?, ?, ?, {NEXT_PROFILE_REVISION})",
+            (
+                int(profile_data['user_id']),
+                int(bool(profile_data.get('verified', False))),
+                profile_data.get('updated_at'),
+                json.dumps(profile_data)
+            )
+        )
+
+    async def submit_profile(self, profile_data):
+        """Save a profile and add it to the verification queue"""
+        def _submit(conn):
+            self._save_profile(conn, profile_data)
+            conn.execute(
+                "INSERT OR REPLACE INTO verification_queue (user_id, submitted_at) VALUES (?, ?)",
+                (int(profile_data['user_id']), datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+
+        await self._write(_submit)
+        self.caches['profiles'].set(int(profile_data['user_id']), profile_data)
+
+    async def get_profiles_after(self, after_id=0, limit=5000):
+        """Get up to limit profiles with a user id above after_id, in user id order"""
+        def _get(conn):
+            rows = conn.execute(
+                "SELECT data FROM profiles WHERE user_id > ? ORDER BY user_id LIMIT ?",
+                (int(after_id), limit)
+            )
+            return [json.loads(row['data']) for row in rows]
+
+        return await self._run(_get)
+
+    async def get_profile_revision(self):
+        """Get the revision of the most recent profile write"""
+        def _get(conn):
+            return conn.execute("SELECT COALESCE(MAX(revision), 0) FROM profiles").fetchone()[0]
+
+        return await self._run(_get)
+
+    async def get_profiles_changed_after(self, revision, limit=1000):
+        """Get up to limit (revision, profile) pairs written after revision, in revision order"""
+        def _get(conn):
+            rows = conn.execute(
+                "SELECT revision, data FROM profiles WHERE revision > ? ORDER BY revision LIMIT ?",
+                (revision, limit)
+            )
+            return [(row['revision'], json.loads(row['data'])) for row in rows]
+
+        return await self._run(_get)
+
+    async def get_pending_profiles(self, offset=0, limit=25):
+        """Get a page of profiles waiting for verification, oldest first, and the total number waiting"""
+        def _get(conn):
+            total = conn.execute("SELECT COUNT(*) FROM verification_queue").fetchone()[0]
+            rows = conn.execute(
+                "SELECT p.data, q.submitted_at FROM verification_queue q JOIN profiles p ON p.user_id = q.user_id "
+                "ORDER BY q.submitted_at, q.user_id LIMIT ? OFFSET ?",
+                (limit, offset)
+            )
+            profiles = []
+            for row in rows:
+                profile_data = json.loads(row['data'])
+                profile_data['submitted_at'] = row['submitted_at']
+                profiles.append(profile_data)
+            return profiles, total
+
+        return await self._run(_get)
+
+    async def resolve_verifications(self, user_ids, verified):
+        """Approve or reject profiles in one transaction, removing them from the queue and returning the profiles that exist; rejecting leaves a profile's verified state as it was"""
+        user_ids = [int(user_id) for user_id in user_ids]
+
+        def _resolve(conn):
+            placeholders = ", ".join("?" * len(user_ids))
+            rows = conn.execute(
+                f"SELECT user_id, data FROM profiles WHERE user_id IN ({placeholders})",
+                user_ids
+            ).fetchall()
+
+            profiles = []
+            for row in rows:
+                profile_data = json.loads(row['data'])
+                if verified:
+                    profile_data['verified'] = True
+                profiles.append(profile_data)
+
+            if verified:
+                conn.executemany(
+                    f"UPDATE profiles SET verified = 1, data = ?, revision = {NEXT_PROFILE_REVISION} WHERE user_id = ?",
+                    [(json.dumps(profile_data), int(profile_data['user_id'])) for profile_data in profiles]
+                )
+            conn.executemany("DELETE FROM verification_queue WHERE user_id = ?", [(user_id,) for user_id in user_ids])
+            return profiles
+
+        if not user_ids:
+            return []
+
+        profiles = await self._write(_resolve)
+        if verified:
+            for profile_data in profiles:
+                self.caches['profiles'].set(int(profile_data['user_id']), profile_data)
+        return profiles
+
+    async def has_agreed_to_terms(self, user_id):
+        """Check whether a user has agreed to the upload terms"""
+        def _get(conn):
+            row = conn.execute("SELECT agreed_to_terms FROM photo_users WHERE user_id = ?", (int(user_id),)).fetchone()
+            return bool(row and row['agreed_to_terms'])
+
+        return await self._cached('terms', int(user_id), _get)
+
+    async def agree_to_terms(self, user_id):
+        """Record that a user has agreed to the upload terms"""
+        def _agree(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO photo_users (user_id, agreed_to_terms, agreed_at) VALUES (?, 1, ?)",
+                (int(user_id), datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+
+        await self._write(_agree)
+        self.caches['terms'].set(int(user_id), True)
+
+    async def get_folders(self, user_id):
+        """Get a user's folder names in creation order"""
+        def _get(conn):
+            rows = conn.execute("SELECT name FROM folders WHERE user_id = ? ORDER BY rowid", (int(user_id),))
+            return [row['name'] for row in rows]
+
+        return await self._cached('folders', int(user_id), _get)
+
+    async def create_folder(self, user_id, folder_name):
+        """Create a folder, returning False if one with the same name (ignoring case) exists"""
+        def _create(conn):
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO folders (user_id, name) VALUES (?, ?)",
+                (int(user_id), folder_name)
+            )
+            return cursor.rowcount == 1
+
+        created = await self._write(_create)
+        self.caches['folders'].invalidate(int(user_id))
+        return created
+
+    def _add_photo(self, conn, user_id, folder_name, photo_data):
+        cursor = conn.execute(
+            "INSERT INTO photos (user_id, folder, filename, uploaded_at, data) VALUES (?, ?, ?, ?, ?)",
+            (int(user_id), folder_name, photo_data['filename'], photo_data['uploaded_at'], json.dumps(photo_data))
+        )
+        if photo_data.get('blob'):
+            referenced = conn.execute("UPDATE blobs SET refcount = refcount + 1 WHERE digest = ?", (photo_data['blob'],)).rowcount
+            if not referenced:
+                raise BlobMissing("The stored copy of this image was removed while it was uploading, please try again")
+        if photo_data.get('dhash'):
+            conn.execute(
+                "INSERT INTO photo_hashes (photo_id, user_id, dhash) VALUES (?, ?, ?)",
+                (cursor.lastrowid, int(user_id), photo_data['dhash'])
+            )
+        exif = photo_data.get('exif')
+        if exif:
+            conn.execute(
+                "INSERT INTO photo_exif (photo_id, user_id, camera, lens, focal_length, focal_length_35mm, iso) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cursor.lastrowid,
+                    int(user_id),
+                    exif.get('camera'),
+                    exif.get('lens'),
+                    exif.get('focal_length'),
+                    exif.get('focal_length_35mm'),
+                    exif.get('iso')
+                )
+            )
+        return cursor.lastrowid
+
+    async def add_photo(self, user_id, folder_name, photo_data):
+        """Insert a photo record, returning its id"""
+        return (await self.add_photos(user_id, folder_name, [photo_data]))[0]
+
+    async def add_photos(self, user_id, folder_name, photos):
+        """Insert several photo records into one folder in a single transaction, returning their ids in order"""
+        def _add(conn):
+            conn.execute(
+                "INSERT OR IGNORE INTO folders (user_id, name) VALUES (?, ?)",
+                (int(user_id), folder_name)
+            )
+            return [self._add_photo(conn, user_id, folder_name, photo_data) for photo_data in photos]
+
+        try:
+            return await self._write(_add)
+        finally:
+            self.caches['folders'].invalidate(int(user_id))
+            self.caches['photos'].invalidate(int(user_id))
+
+    async def get_blob(self, digest):
+        """Get {'renditions', 'dhash', 'exif'} stored for a content digest, or None if that content hasn't been processed"""
+        def _get(conn):
+            row = conn.execute("SELECT renditions, dhash, exif FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if not row:
+                return None
+
+            return {
+                'renditions': json.loads(row['renditions']),
+                'dhash': row['dhash'],
+                'exif': json.loads(row['exif']) if row['exif'] else {}
+            }
+
+        return await self._run(_get)
+
+    async def add_blob(self, digest, renditions, dhash=None, exif=None):
+        """Record the renditions written for a content digest; photos referencing it bump its refcount"""
+        def _add(conn):
+            conn.execute(
+                "INSERT OR IGNORE INTO blobs (digest, refcount, created_at, renditions, dhash, exif) VALUES (?, 0, ?, ?, ?, ?)",
+                (digest, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), json.dumps(renditions), dhash, json.dumps(exif or {}))
+            )
+
+        await self._write(_add)
+
+    async def remove_unreferenced_blob(self, digest):
+        """Delete a blob record no photo references, returning True if its files can be removed"""
+        def _remove(conn):
+            return conn.execute("DELETE FROM blobs WHERE digest = ? AND refcount = 0", (digest,)).rowcount == 1
+
+        return await self._write(_remove)
+
+    async def get_photo_hashes_after(self, after_id=0, limit=5000):
+        """Get up to limit (photo_id, user_id, dhash) rows for photos added after after_id"""
+        def _get(conn):
+            rows = conn.execute(
+                "SELECT photo_id, user_id, dhash FROM photo_hashes WHERE photo_id > ? ORDER BY photo_id LIMIT ?",
+                (after_id, limit)
+            )
+            return [tuple(row) for row in rows]
+
+        return await self._run(_get)
+
+    async def find_photos_by_equipment(self, camera=None, lens=None, focal_length=None, limit=10, visible_to=None):
+        """Get the newest photos matching a camera or lens name prefix and/or focal length (mm, actual or 35mm equivalent), and how many match; with visible_to, only photos whose owner is verified or is that user"""
+        conditions = []
+        params = []
+        if visible_to is not None:
+            conditions.append(
+                "(e.user_id = ? OR EXISTS (SELECT 1 FROM profiles WHERE profiles.user_id = e.user_id AND profiles.verified = 1))"
+            )
+            params.append(int(visible_to))
+        if camera:
+            conditions.append("e.camera LIKE ? ESCAPE '\\'")
+            params.append(self._like_prefix(camera))
+        if lens:
+            conditions.append("e.lens LIKE ? ESCAPE '\\'")
+            params.append(self._like_prefix(lens))
+        if focal_length:
+            conditions.append(
+                "e.photo_id IN (SELECT photo_id FROM photo_exif WHERE focal_length BETWEEN ? AND ? "
+                "UNION SELECT photo_id FROM photo_exif WHERE focal_length_35mm = ?)"
+            )
+            params.extend((focal_length - 0.5, focal_length + 0.5, int(focal_length)))
+        where = " AND ".join(conditions) or "1"
+
+        def _find(conn):
+            total = conn.execute(f"SELECT COUNT(*) FROM photo_exif e WHERE {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT p.id, p.user_id, p.folder, p.data FROM photo_exif e JOIN photos p ON p.id = e.photo_id "
+                f"WHERE {where} ORDER BY e.photo_id DESC LIMIT ?",
+                params + [limit]
+            )
+            return [self._photo_from_row(row) for row in rows], total
+
+        return await self._run(_find)
+
+    @staticmethod
+    def _like_prefix(text):
+        """Build a LIKE pattern matching text as a prefix, so the NOCASE index can be used"""
+        return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+    async def get_photos(self, photo_ids, visible_to=None):
+        """Get photos by id, as {id: photo} with each photo's user_id and folder; with visible_to, only photos whose owner is verified or is that user"""
+        photo_ids = [int(photo_id) for photo_id in photo_ids]
+
+        def _get(conn):
+            placeholders = ", ".join("?" * len(photo_ids))
+            if visible_to is None:
+                rows = conn.execute(
+                    f"SELECT id, user_id, folder, data FROM photos WHERE id IN ({placeholders})",
+                    photo_ids
+                )
+            else:
+                rows = conn.execute(
+                    f"SELECT photos.id, photos.user_id, photos.folder, photos.data FROM photos "
+                    f"LEFT JOIN profiles ON profiles.user_id = photos.user_id "
+                    f"WHERE photos.id IN ({placeholders}) AND (profiles.verified = 1 OR photos.user_id = ?)",
+                    [*photo_ids, int(visible_to)]
+                )
+            return {row['id']: self._photo_from_row(row) for row in rows}
+
+        if not photo_ids:
+            return {}
+        return await self._run(_get)
+
+    async def find_photo(self, user_id, folder_name, filename):
+        """Get the photo in a folder stored under filename, or None"""
+        def _find(conn):
+            row = conn.execute(
+                "SELECT id, folder, data FROM photos WHERE user_id = ? AND folder = ? AND filename = ?",
+                (int(user_id), folder_name, filename)
+            ).fetchone()
+            return self._photo_from_row(row) if row else None
+
+        return await self._run(_find)
+
+    async def find_attachment(self, user_id, folder_name, attachment_id):
+        """Get the photo saved from a Discord attachment into a folder, or None"""
+        def _find(conn):
+            row = conn.execute(
+                "SELECT id, data FROM photos WHERE user_id = ? AND folder = ? AND json_extract(data, '$.attachment_id') = ?",
+                (int(user_id), folder_name, int(attachment_id))
+            ).fetchone()
+            if not row:
+                return None
+
+            photo = json.loads(row['data'])
+            photo['id'] = row['id']
+            return photo
+
+        return await self._run(_find)
+
+    async def get_gallery_summary(self, user_id):
+        """Get how many folders with photos and how many photos a user has, and their latest photo"""
+        def _get(conn):
+            row = conn.execute(
+                "SELECT COUNT(DISTINCT folder) AS folders, COUNT(*) AS photos FROM photos WHERE user_id = ?",
+                (int(user_id),)
+            ).fetchone()
+            latest = conn.execute(
+                "SELECT id, folder, data FROM photos WHERE user_id = ? ORDER BY id DESC LIMIT 1",
+                (int(user_id),)
+            ).fetchone()
+            return {
+                'folders': row['folders'],
+                'photos': row['photos'],
+                'latest': self._photo_from_row(latest) if latest else None
+            }
+
+        return await self._cached('photos', int(user_id), _get)
+
+    async def get_folder_page(self, user_id, after_name=None, limit=25):
+        """Get up to limit of a user's folders that have photos, in name order after after_name, with each folder's photo count"""
+        def _get(conn):
+            rows = conn.execute(
+                "SELECT name, (SELECT COUNT(*) FROM photos WHERE photos.user_id = folders.user_id AND photos.folder = folders.name) AS count "
+                "FROM folders WHERE user_id = ? AND name > ? "
+                "AND EXISTS (SELECT 1 FROM photos WHERE photos.user_id = folders.user_id AND photos.folder = folders.name) "
+                "ORDER BY name LIMIT ?",
+                (int(user_id), after_name or '', limit)
+            )
+            return [{'name': row['name'], 'count': row['count']} for row in rows]
+
+        return await self._run(_get)
+
+    async def count_photos(self, user_id, folder_name):
+        """Count the photos in a folder"""
+        def _count(conn):
+            return conn.execute(
+                "SELECT COUNT(*) FROM photos WHERE user_id = ? AND folder = ?",
+                (int(user_id), folder_name)
+            ).fetchone()[0]
+
+        return await self._run(_count)
+
+    async def get_photos_after(self, user_id, folder_name, after_id=0, limit=10):
+        """Get up to limit photos in a folder uploaded after the photo with id after_id, oldest first"""
+        def _get(conn):
+            rows = conn.execute(
+                "SELECT id, folder, data FROM photos WHERE user_id = ? AND folder = ? AND id > ? ORDER BY id LIMIT ?",
+                (int(user_id), folder_name, after_id, limit)
+            )
+            return [self._photo_from_row(row) for row in rows]
+
+        return await self._run(_get)
+
+    async def get_photos_before(self, user_id, folder_name, before_id, limit=10):
+        """Get up to limit photos in a folder uploaded before the photo with id before_id, oldest first"""
+        def _get(conn):
+            rows = conn.execute(
+                "SELECT id, folder, data FROM photos WHERE user_id = ? AND folder = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (int(user_id), folder_name, before_id, limit)
+            )
+            return [self._photo_from_row(row) for row in reversed(rows.fetchall())]
+
+        return await self._run(_get)
+
+    @staticmethod
+    def _photo_from_row(row):
+        photo = json.loads(row['data'])
+        photo['id'] = row['id']
+        photo['folder'] = row['folder']
+        if 'user_id' in row.keys():
+            photo['user_id'] = row['user_id']
+        return photo
+
+
+def get_store(bot):
+    """Get the store shared by all cogs, opening it on first use"""
+    if getattr(bot, 'store', None) is None:
+        config = load_config()
+        bot.store = Store(
+            config["database_path"],
+            cache_size=config["cache_size"],
+            cache_ttl=config["cache_ttl"],
+            busy_timeout=config["database_busy_timeout"],
+            cache_check_interval=config["cache_check_interval"]
+        )
+    return bot.store
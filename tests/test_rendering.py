@@ -0,0 +1,76 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rendering import ProfileRenderer
+
+
+EMOJI = {name: f":{name}:" for name in ("camera", "list", "pinned", "apps", "bird", "globe", "phone", "dot", "hourglass", "check")}
+
+
+class CountingRenderer(ProfileRenderer):
+    """Counts how often each embed is actually built rather than served from the cache"""
+
+    def __init__(self):
+        super().__init__(EMOJI)
+        self.builds = {'public': 0, 'moderator': 0}
+
+    def _build_public(self, profile):
+        self.builds['public'] += 1
+        return super()._build_public(profile)
+
+    def _build_moderator(self, profile):
+        self.builds['moderator'] += 1
+        return super()._build_moderator(profile)
+
+
+def make_profile(**changes):
+    return {
+        'user_id': 1,
+        'username': 'photographer',
+        'bio': 'Street and film',
+        'updated_at': '2024-01-01 00:00:00',
+        'verified': True,
+        **changes
+    }
+
+
+class ProfileRendererTest(unittest.TestCase):
+    def test_builds_each_role_once_per_version(self):
+        renderer = CountingRenderer()
+        profile = make_profile()
+
+        for _ in range(5):
+            renderer.render(profile)
+            renderer.render(profile, 'moderator')
+
+        self.assertEqual(renderer.builds, {'public': 1, 'moderator': 1})
+
+    def test_rebuilds_after_profile_changes(self):
+        renderer = CountingRenderer()
+        renderer.render(make_profile())
+        renderer.render(make_profile(updated_at='2024-02-01 00:00:00'))
+        renderer.render(make_profile(updated_at='2024-02-01 00:00:00'))
+
+        renderer.invalidate(1)
+        renderer.render(make_profile(updated_at='2024-02-01 00:00:00'))
+
+        self.assertEqual(renderer.builds['public'], 3)
+
+    def test_returned_embeds_are_independent(self):
+        renderer = CountingRenderer()
+        profile = make_profile()
+
+        embed = renderer.render(profile)
+        embed.title = "changed"
+        embed.add_field(name="extra", value="field")
+
+        again = renderer.render(profile)
+        self.assertNotEqual(again.title, "changed")
+        self.assertNotIn("extra", [field.name for field in again.fields])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,22 +1,46 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
 import os
 import asyncio
+import hashlib
+from contextlib import AsyncExitStack
 from datetime import datetime
+from functools import partial
 from io import BytesIO
-from PIL import Image
-import aiohttp
-import uuid
+import tempfile
+from urllib.parse import quote
+from http_client import DownloadError, HTTPClient
+from fileutils import read_file, remove_file, run_io
+from locks import KeyedLocks
+from imaging import RENDITIONS, ImageProcessor, ImageTooLarge, ProcessorBusy, hash_image, process_image
+from settings import load_config
+from storage import get_store
+from similarity import get_similarity_index
 
 
-if not os.path.exists('photos'):
-    os.makedirs('photos')
-
 class UploadCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.config = load_config()
+        self.store = get_store(bot)
+        self.similarity = get_similarity_index(bot)
+        self.locks = KeyedLocks()
+        self.upload_slots = KeyedLocks(limit=self.config["upload_concurrency"])
+        
+        
+        self.processor = ImageProcessor(
+            workers=self.config["image_workers"],
+            queue_size=self.config["image_queue_size"],
+            queue_timeout=self.config["image_queue_timeout"]
+        )
+        self.http = HTTPClient(
+            limit=self.config["http_connections"],
+            limit_per_host=self.config["http_connections_per_host"],
+            timeout=self.config["http_timeout"],
+            retries=self.config["http_retries"],
+            max_backoff=self.config["http_max_backoff"]
+        )
         
         
         self.emoji = {
@@ -37,46 +61,22 @@ class UploadCog(commands.Cog):
             "dot": "<:dot:1344650103386013727>",
             "folder": "<:folder:1344680932640161812>"
         }
-        
-        
-        self._ensure_photo_directories()
     
-    def _ensure_photo_directories(self):
-        """Ensure all necessary photo directories exist"""
-        
-        if os.path.exists('profiles'):
-            for filename in os.listdir('profiles'):
-                if filename.endswith('.json'):
-                    user_id = filename.split('.')[0]
-                    user_photo_dir = f'photos/{user_id}'
-                    if not os.path.exists(user_photo_dir):
-                        os.makedirs(user_photo_dir)
+    async def cog_load(self):
+        """Start the image processing workers and the HTTP session"""
+        self.processor.start()
+        await self.http.start()
     
-    def _get_user_metadata_path(self, user_id):
-        """Get the path to a user's photo metadata file"""
-        return f'photos/{user_id}/metadata.json'
+    async def cog_unload(self):
+        """Stop the image processing workers and close the HTTP session"""
+        self.processor.shutdown()
+        await self.http.close()
     
-    def _get_user_folders(self, user_id):
+    async def _get_user_folders(self, user_id):
         """Get a list of folders for the user"""
-        user_dir = f'photos/{user_id}'
-        
-        
-        if not os.path.exists(user_dir):
-            os.makedirs(user_dir)
-        
-        
-        metadata_path = self._get_user_metadata_path(user_id)
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
-                return metadata.get('folders', [])
-            except:
-                return []
-        
-        return []
+        return await self.store.get_folders(user_id)
 
-    def _create_folder(self, user_id, folder_name):
+    async def _create_folder(self, user_id, folder_name):
         """Create a new folder for the user"""
         
         folder_name = ''.join(c for c in folder_name if c.isalnum() or c in ' -_').strip()
@@ -85,140 +85,294 @@ class UploadCog(commands.Cog):
             return False, "Invalid folder name"
         
         
-        user_folders = self._get_user_folders(user_id)
-        
-        
-        if folder_name.lower() in [f.lower() for f in user_folders]:
+        if not await self.store.create_folder(user_id, folder_name):
             return False, "A folder with this name already exists"
         
+        return True, folder_name
+
+    def _get_photo_segments(self, user_id, folder_name, photo, filename):
+        """Get the path segments of a stored rendition relative to photos/, which are also its path under photo_base_url"""
+        if photo.get('blob'):
+            return ['blobs', photo['blob'][:2], filename]
+        return [str(user_id), folder_name, filename]
+
+    def _get_photo_key(self, user_id, folder_name, photo, filename):
+        """Get a stored rendition's path relative to photos/"""
+        return '/'.join(self._get_photo_segments(user_id, folder_name, photo, filename))
+
+    def _get_photo_url(self, base_url, user_id, folder_name, photo, filename):
+        """Get a stored rendition's URL under photo_base_url, quoting each path segment"""
+        segments = self._get_photo_segments(user_id, folder_name, photo, filename)
+        return f"{base_url.rstrip('/')}/" + '/'.join(quote(segment, safe='') for segment in segments)
+
+    def _get_photo_path(self, user_id, folder_name, photo, filename):
+        """Get the path to a stored photo"""
+        return f"photos/{self._get_photo_key(user_id, folder_name, photo, filename)}"
+
+    def _get_blob_dir(self, digest):
+        """Get the directory holding the renditions for a content digest"""
+        return f"photos/blobs/{digest[:2]}"
+
+    def _pick_rendition(self, photo, min_dimension):
+        """Pick the smallest stored rendition whose longest side is at least min_dimension"""
+        renditions = photo.get('renditions')
+        if not renditions:
+            return photo['filename']
         
-        metadata_path = self._get_user_metadata_path(user_id)
-        
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
-            except:
-                
-                metadata = {'agreed_to_terms': False, 'folders': [], 'photos': {}}
-        else:
-            
-            metadata = {'agreed_to_terms': False, 'folders': [], 'photos': {}}
-        
-        
-        if 'folders' not in metadata:
-            metadata['folders'] = []
-        
-        metadata['folders'].append(folder_name)
-        
+        adequate = [r for r in renditions.values() if max(r['width'], r['height']) >= min_dimension]
+        if adequate:
+            return min(adequate, key=lambda r: r['size'])['filename']
         
-        folder_path = f'photos/{user_id}/{folder_name}'
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
+        return max(renditions.values(), key=lambda r: (r['width'] * r['height'], -r['size']))['filename']
+    
+    async def _load_photo_image(self, user_id, folder_name, photo, min_dimension, warm=False):
+        """Resolve a photo to (url, filename, data), where data is None when linking to url; warm=True fetches a photo_base_url link once so the CDN caches it"""
+        filename = self._pick_rendition(photo, min_dimension)
+        path = self._get_photo_path(user_id, folder_name, photo, filename)
+        
+        base_url = self.config["photo_base_url"]
+        if base_url:
+            if not await run_io(os.path.exists, path):
+                return photo['cdn_url'], None, None
+            url = self._get_photo_url(base_url, user_id, folder_name, photo, filename)
+            if warm:
+                try:
+                    async with self.http.get(url) as resp:
+                        await resp.read()
+                except DownloadError:
+                    return photo['cdn_url'], None, None
+            return url, None, None
         
+        data = await run_io(read_file, path)
+        if data is None:
+            return photo['cdn_url'], None, None
         
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=4)
+        return f"attachment://{filename}", filename, data
+    
+    async def _get_photo_image(self, user_id, folder_name, photo, min_dimension):
+        """Get the embed image URL and file for a photo, preferring a stored rendition over the CDN URL"""
+        url, filename, data = await self._load_photo_image(user_id, folder_name, photo, min_dimension)
+        if data is None:
+            return url, None
         
-        return True, folder_name
-
-    async def _process_image(self, attachment):
-        """Process an image: download, convert to PNG, optimize for mobile/PC"""
+        return url, discord.File(BytesIO(data), filename=filename)
+    
+    async def _download(self, attachment):
+        """Download an attachment to a temp file, hashing it as it streams, and return (path, sha256 hex digest)"""
+        digest = hashlib.sha256()
+        fd, path = await run_io(partial(tempfile.mkstemp, prefix='upload-'))
         try:
+            f = await run_io(os.fdopen, fd, 'wb')
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(attachment.url) as resp:
-                    if resp.status != 200:
-                        return None, "Failed to download image"
-                    
-                    image_data = await resp.read()
+            def write(chunk):
+                digest.update(chunk)
+                f.write(chunk)
             
+            try:
+                await self.http.download(attachment.url, partial(run_io, write), max_bytes=self.config["max_upload_bytes"])
+            finally:
+                await run_io(f.close)
+        except BaseException:
+            await run_io(remove_file, path)
+            raise
+        
+        return path, digest.hexdigest()
+    
+    async def _process_image(self, attachment):
+        """Download an attachment and get its renditions from the blob store, only decoding and resizing content it hasn't seen"""
+        try:
             
-            image = Image.open(BytesIO(image_data))
+            max_bytes = self.config["max_upload_bytes"]
+            if attachment.size > max_bytes:
+                return None, f"This image is too large (max {max_bytes // (1024 * 1024)} MB)"
             
             
-            max_dimension = 1920
+            path, digest = await self._download(attachment)
+            try:
+                async with self.locks(('blob', digest)):
+                    blob = await self.store.get_blob(digest)
+                    if blob:
+                        return {'digest': digest, 'created': False, **blob}, None
+                    
+                    result = await self.processor.run(
+                        process_image,
+                        path,
+                        self._get_blob_dir(digest),
+                        digest,
+                        self.config["max_image_pixels"],
+                        self.config["image_format"]
+                    )
+                    try:
+                        await self.store.add_blob(digest, result['renditions'], result['dhash'], result['exif'])
+                    except BaseException:
+                        await self._remove_blob_files(digest, result['renditions'])
+                        raise
+            finally:
+                await run_io(remove_file, path)
             
+            return {'digest': digest, 'created': True, **result}, None
+        except (DownloadError, ImageTooLarge, ProcessorBusy) as e:
+            return None, str(e)
+        except Exception as e:
+            return None, f"Error processing image: {str(e)}"
+    
+    async def _hash_attachment(self, attachment):
+        """Get an attachment's perceptual hash, reusing the stored one when the same content was uploaded before"""
+        try:
+            max_bytes = self.config["max_upload_bytes"]
+            if attachment.size > max_bytes:
+                return None, f"This image is too large (max {max_bytes // (1024 * 1024)} MB)"
             
-            width, height = image.size
-            if width > max_dimension or height > max_dimension:
-                if width > height:
-                    new_width = max_dimension
-                    new_height = int(height * (max_dimension / width))
-                else:
-                    new_height = max_dimension
-                    new_width = int(width * (max_dimension / height))
+            path, digest = await self._download(attachment)
+            try:
+                blob = await self.store.get_blob(digest)
+                if blob and blob['dhash']:
+                    return blob['dhash'], None
                 
-                image = image.resize((new_width, new_height), Image.LANCZOS)
-            
-            
-            output = BytesIO()
-            image.save(output, format='PNG', optimize=True)
-            output.seek(0)
-            
-            return output, None
+                return await self.processor.run(hash_image, path, self.config["max_image_pixels"]), None
+            finally:
+                await run_io(remove_file, path)
+        except (DownloadError, ImageTooLarge, ProcessorBusy) as e:
+            return None, str(e)
         except Exception as e:
             return None, f"Error processing image: {str(e)}"
+    
+    async def _find_near_duplicates(self, user_id, photo):
+        """Get the user's other photos that look almost the same as photo"""
+        if not photo.get('dhash'):
+            return []
+        
+        matches = await self.similarity.search(
+            photo['dhash'],
+            max_distance=self.config["duplicate_max_distance"],
+            limit=3,
+            user_id=user_id,
+            exclude={photo['id']}
+        )
+        photos = await self.store.get_photos([photo_id for _, photo_id, _ in matches])
+        return [photos[photo_id] for _, photo_id, _ in matches if photo_id in photos]
+    
+    def _is_moderator(self, user):
+        """Check whether a user can see photos from unverified profiles"""
+        return isinstance(user, discord.Member) and user.guild_permissions.manage_messages
+    
+    def _format_exif(self, exif):
+        """Format a photo's camera, lens and exposure settings on one line"""
+        parts = [exif.get('camera'), exif.get('lens')]
+        if exif.get('focal_length'):
+            parts.append(f"{exif['focal_length']:g}mm")
+        elif exif.get('focal_length_35mm'):
+            parts.append(f"{exif['focal_length_35mm']}mm (35mm equiv.)")
+        if exif.get('aperture'):
+            parts.append(f"f/{exif['aperture']:g}")
+        if exif.get('exposure'):
+            parts.append(f"{exif['exposure']}s")
+        if exif.get('iso'):
+            parts.append(f"ISO {exif['iso']}")
+        return " · ".join(part for part in parts if part)
+    
+    async def _remove_blob_files(self, digest, renditions):
+        """Delete the rendition files for a content digest"""
+        for rendition in renditions.values():
+            await run_io(remove_file, f"{self._get_blob_dir(digest)}/{rendition['filename']}")
 
     async def _save_photo(self, user_id, folder_name, attachment, title=None, description=None):
         """Save a photo to the user's folder using Discord's CDN"""
+        return (await self._save_photos(user_id, folder_name, [attachment], title, description))[0]
+    
+    async def _save_photos(self, user_id, folder_name, attachments, title=None, description=None):
+        """Save several photos to the user's folder at once, returning (success, photo or error) for each attachment"""
         
-        metadata_path = self._get_user_metadata_path(user_id)
-        
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
-                
-                if not metadata.get('agreed_to_terms', False):
-                    return False, "You must agree to the terms before uploading photos"
-            except:
-                return False, "Error reading user metadata"
-        else:
-            return False, "You must agree to the terms before uploading photos"
-        
-        
-        processed_image, error = await self._process_image(attachment)
-        if error:
-            return False, error
-        
-        
-        filename = f"{uuid.uuid4().hex}.png"
-        
-        
-        cdn_url = attachment.url
+        if not await self.store.has_agreed_to_terms(user_id):
+            return [(False, "You must agree to the terms before uploading photos")] * len(attachments)
         
         
-        try:
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+        async with AsyncExitStack() as stack:
+            for attachment_id in sorted({attachment.id for attachment in attachments}):
+                await stack.enter_async_context(self.locks(('upload', user_id, attachment_id)))
+            
+            return await self._store_photos(user_id, folder_name, attachments, title, description)
+    
+    async def _prepare_photo(self, user_id, folder_name, attachment):
+        """Get (existing photo, blob, error) for an attachment, processing it in one of the user's upload slots"""
+        existing = await self.store.find_attachment(user_id, folder_name, attachment.id)
+        if existing:
+            return existing, None, None
+        
+        async with self.upload_slots(user_id):
+            blob, error = await self._process_image(attachment)
+        return None, blob, error
+    
+    async def _store_photos(self, user_id, folder_name, attachments, title, description):
+        """Process attachments concurrently and record the new ones in the user's folder in a single write"""
+        prepared = await asyncio.gather(*(self._prepare_photo(user_id, folder_name, attachment) for attachment in attachments))
+        
+        results = [None] * len(attachments)
+        pending = {}
+        created = {blob['digest']: blob['renditions'] for _, blob, _ in prepared if blob and blob['created']}
+        for index, (attachment, (existing, blob, error)) in enumerate(zip(attachments, prepared)):
+            if error:
+                results[index] = (False, error)
+                continue
+            if existing:
+                results[index] = (True, existing)
+                continue
+            
+            renditions = blob['renditions']
+            filename = renditions['full']['filename']
+            if filename in pending:
+                pending[filename][1].append(index)
+                continue
             
-            if 'photos' not in metadata:
-                metadata['photos'] = {}
+            existing = await self.store.find_photo(user_id, folder_name, filename)
+            if existing:
+                results[index] = (True, existing)
+                continue
             
-            if folder_name not in metadata['photos']:
-                metadata['photos'][folder_name] = []
             
+            photo_title = title or attachment.filename
+            if title and len(attachments) > 1:
+                photo_title = f"{title} ({index + 1})"
             
             photo_data = {
-                'filename': filename,  
-                'cdn_url': cdn_url,    
+                'filename': filename,
+                'cdn_url': attachment.url,
+                'attachment_id': attachment.id,
                 'original_name': attachment.filename,
                 'uploaded_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'title': title or attachment.filename,
+                'title': photo_title,
                 'description': description or '',
-                'size': len(processed_image.getvalue())  
+                'size': renditions['full']['size'],
+                'renditions': renditions,
+                'blob': blob['digest']
             }
-            
-            metadata['photos'][folder_name].append(photo_data)
-            
-            
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=4)
-            
-            return True, photo_data
+            if blob['dhash']:
+                photo_data['dhash'] = blob['dhash']
+            if blob['exif']:
+                photo_data['exif'] = blob['exif']
+            pending[filename] = (photo_data, [index], blob)
+        
+        if not pending:
+            return results
+        
+        
+        try:
+            photo_ids = await self.store.add_photos(user_id, folder_name, [photo_data for photo_data, _, _ in pending.values()])
         except Exception as e:
-            return False, f"Error updating metadata: {str(e)}"
+            for digest, renditions in created.items():
+                async with self.locks(('blob', digest)):
+                    if await self.store.remove_unreferenced_blob(digest):
+                        await self._remove_blob_files(digest, renditions)
+            for _, indexes, _ in pending.values():
+                for index in indexes:
+                    results[index] = (False, f"Error updating metadata: {str(e)}")
+            return results
+        
+        for photo_id, (photo_data, indexes, _) in zip(photo_ids, pending.values()):
+            photo_data['id'] = photo_id
+            for index in indexes:
+                results[index] = (True, photo_data)
+        return results
 
     @app_commands.command(
         name="upload",
@@ -226,9 +380,47 @@ class UploadCog(commands.Cog):
     )
     async def upload(self, interaction: discord.Interaction, image: discord.Attachment = None, title: str = None, description: str = None):
         """Upload a photo to your photography portfolio"""
+        await self._start_upload(interaction, [image] if image else [], title, description)
+    
+    @app_commands.command(
+        name="batchupload",
+        description="Upload up to 10 photos to your photography portfolio at once"
+    )
+    async def batchupload(
+        self,
+        interaction: discord.Interaction,
+        image1: discord.Attachment,
+        image2: discord.Attachment = None,
+        image3: discord.Attachment = None,
+        image4: discord.Attachment = None,
+        image5: discord.Attachment = None,
+        image6: discord.Attachment = None,
+        image7: discord.Attachment = None,
+        image8: discord.Attachment = None,
+        image9: discord.Attachment = None,
+        image10: discord.Attachment = None,
+        title: str = None,
+        description: str = None
+    ):
+        """Upload up to 10 photos to your photography portfolio at once"""
+        images = [image1, image2, image3, image4, image5, image6, image7, image8, image9, image10]
+        images = [image for image in images if image]
+        limit = self.config["batch_upload_limit"]
+        if len(images) > limit:
+            embed = discord.Embed(
+                title=f"{self.emoji['denied']} Too Many Photos",
+                description=f"You can upload at most {limit} photos at once, but you attached {len(images)}. Please try again with fewer.",
+                color=discord.Color.red()
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        await self._start_upload(interaction, images, title, description)
+    
+    async def _start_upload(self, interaction, images, title, description):
+        """Check the user can upload the images and ask which folder they go in"""
         
-        profile_path = f'profiles/{interaction.user.id}.json'
-        if not os.path.exists(profile_path):
+        if not await self.store.get_profile(interaction.user.id):
             embed = discord.Embed(
                 title=f"{self.emoji['denied']} Profile Required",
                 description="You need to create a photography profile first. Use `/profile` to set one up.",
@@ -238,16 +430,20 @@ class UploadCog(commands.Cog):
             return
         
         
-        if not image:
+        if not images:
             
             await self._show_upload_options(interaction)
             return
         
         
-        if not image.content_type or not image.content_type.startswith('image/'):
+        invalid = [image.filename for image in images if not image.content_type or not image.content_type.startswith('image/')]
+        if invalid:
+            message = "Please upload an image file (jpg, png, etc.)"
+            if len(images) > 1:
+                message = f"These files aren't images (jpg, png, etc.): {', '.join(invalid)}"
             embed = discord.Embed(
                 title=f"{self.emoji['denied']} Invalid File",
-                description="Please upload an image file (jpg, png, etc.)",
+                description=message,
                 color=discord.Color.red()
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -258,45 +454,36 @@ class UploadCog(commands.Cog):
         
         
         user_id = str(interaction.user.id)
-        metadata_path = self._get_user_metadata_path(user_id)
-        
-        has_agreed = False
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
-                has_agreed = metadata.get('agreed_to_terms', False)
-            except:
-                pass
         
-        if not has_agreed:
+        if not await self.store.has_agreed_to_terms(user_id):
             
             await self._show_terms_agreement(interaction)
             return
         
         
-        folders = self._get_user_folders(user_id)
+        async with self.locks(('folders', user_id)):
+            folders = await self._get_user_folders(user_id)
+            
+            if not folders:
+                success, result = await self._create_folder(user_id, "My Photos")
+                if success:
+                    folders = ["My Photos"]
         
         if not folders:
-            
-            success, result = self._create_folder(user_id, "My Photos")
-            if success:
-                folders = ["My Photos"]
-            else:
-                embed = discord.Embed(
-                    title=f"{self.emoji['denied']} Error",
-                    description=f"Could not create a default folder: {result}",
-                    color=discord.Color.red()
-                )
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
+            embed = discord.Embed(
+                title=f"{self.emoji['denied']} Error",
+                description=f"Could not create a default folder: {result}",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
         
         
-        view = FolderSelectionView(self, interaction.user, folders, image, title, description)
+        view = FolderSelectionView(self, interaction.user, folders, images, title, description)
         
         embed = discord.Embed(
             title=f"{self.emoji['folder']} Select Folder",
-            description="Please select a folder to upload your photo to:",
+            description=f"Please select a folder to upload your {view.noun} to:",
             color=discord.Color.blurple()
         )
         
@@ -307,7 +494,7 @@ class UploadCog(commands.Cog):
         user_id = str(interaction.user.id)
         
         
-        folders = self._get_user_folders(user_id)
+        folders = await self._get_user_folders(user_id)
         
         embed = discord.Embed(
             title=f"{self.emoji['camera']} Photo Upload",
@@ -363,7 +550,7 @@ class UploadCog(commands.Cog):
             modal.add_item(folder_name_input)
             
             async def modal_callback(modal_interaction):
-                success, result = self._create_folder(str(interaction.user.id), folder_name_input.value)
+                success, result = await self._create_folder(str(interaction.user.id), folder_name_input.value)
                 
                 if success:
                     embed = discord.Embed(
@@ -387,16 +574,7 @@ class UploadCog(commands.Cog):
         view.add_item(new_folder_button)
         
         
-        metadata_path = self._get_user_metadata_path(user_id)
-        has_agreed = False
-        
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
-                has_agreed = metadata.get('agreed_to_terms', False)
-            except:
-                pass
+        has_agreed = await self.store.has_agreed_to_terms(user_id)
         
         
         terms_status = f"{self.emoji['check']} Agreed" if has_agreed else f"{self.emoji['denied']} Not Agreed"
@@ -441,7 +619,7 @@ class UploadCog(commands.Cog):
                 "By uploading photos, you agree that:\n\n"
                 "1. You are the copyright owner of all photos you upload.\n"
                 "2. You grant us a non-exclusive license to display your photos in several Discord servers.\n"
-                "3. All photos will be converted to PNG format for compatibility.\n"
+                "3. All photos will be converted to web-friendly formats (WebP or JPEG, PNG for images with transparency).\n"
                 "4. Photos may be resized to ensure proper display on all devices.\n"
                 "5. You retain all rights to your photos and can delete them at any time.\n"
                 "6. You acknowledge that whilst your photos are on our platform we have free will to use them however we like.\n"
@@ -463,30 +641,7 @@ class UploadCog(commands.Cog):
                 await button_interaction.response.send_message("You can't agree to terms for someone else.", ephemeral=True)
                 return
             
-            user_id = str(interaction.user.id)
-            
-            
-            user_dir = f'photos/{user_id}'
-            if not os.path.exists(user_dir):
-                os.makedirs(user_dir)
-            
-            
-            metadata_path = self._get_user_metadata_path(user_id)
-            
-            if os.path.exists(metadata_path):
-                try:
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                except:
-                    metadata = {'folders': [], 'photos': {}}
-            else:
-                metadata = {'folders': [], 'photos': {}}
-            
-            metadata['agreed_to_terms'] = True
-            metadata['agreed_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=4)
+            await self.store.agree_to_terms(interaction.user.id)
             
             success_embed = discord.Embed(
                 title=f"{self.emoji['check']} Terms Accepted",
@@ -536,8 +691,7 @@ class UploadCog(commands.Cog):
         user_id = str(target_user.id)
         
         
-        profile_path = f'profiles/{user_id}.json'
-        if not os.path.exists(profile_path):
+        if not await self.store.get_profile(user_id):
             if target_user == interaction.user:
                 embed = discord.Embed(
                     title=f"{self.emoji['denied']} Profile Required",
@@ -555,33 +709,10 @@ class UploadCog(commands.Cog):
             return
         
         
-        metadata_path = self._get_user_metadata_path(user_id)
-        
-        if not os.path.exists(metadata_path):
-            if target_user == interaction.user:
-                embed = discord.Embed(
-                    title=f"{self.emoji['camera']} No Photos",
-                    description="You haven't uploaded any photos yet. Use `/upload` to add some!",
-                    color=discord.Color.blue()
-                )
-            else:
-                embed = discord.Embed(
-                    title=f"{self.emoji['camera']} No Photos",
-                    description=f"{target_user.display_name} hasn't uploaded any photos yet.",
-                    color=discord.Color.blue()
-                )
-            
-            await interaction.response.send_message(embed=embed, ephemeral=target_user == interaction.user)
-            return
-        
-        
         try:
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+            summary = await self.store.get_gallery_summary(user_id)
             
-            photos_by_folder = metadata.get('photos', {})
-            
-            if not photos_by_folder:
+            if not summary['photos']:
                 if target_user == interaction.user:
                     embed = discord.Embed(
                         title=f"{self.emoji['camera']} No Photos",
@@ -599,7 +730,7 @@ class UploadCog(commands.Cog):
                 return
             
             
-            await self._show_folder_selection(interaction, target_user, photos_by_folder)
+            await self._show_folder_selection(interaction, target_user, summary)
         
         except Exception as e:
             embed = discord.Embed(
@@ -610,49 +741,142 @@ class UploadCog(commands.Cog):
             
             await interaction.response.send_message(embed=embed, ephemeral=True)
     
-    async def _show_folder_selection(self, interaction, target_user, photos_by_folder):
-        """Show folder selection for viewing photos"""
+    @app_commands.command(
+        name="similar",
+        description="Find photos that look like an image"
+    )
+    async def similar(self, interaction: discord.Interaction, image: discord.Attachment):
+        """Find stored photos that look like the given image"""
+        if not image.content_type or not image.content_type.startswith('image/'):
+            embed = discord.Embed(
+                title=f"{self.emoji['denied']} Invalid File",
+                description="Please upload an image file (jpg, png, etc.)",
+                color=discord.Color.red()
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        await interaction.response.defer(ephemeral=True)
+        
+        
+        image_hash, error = await self._hash_attachment(image)
+        if error:
+            embed = discord.Embed(
+                title=f"{self.emoji['denied']} Error",
+                description=f"Could not read image: {error}",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        
+        matches = await self.similarity.search(image_hash, max_distance=self.config["similar_max_distance"], limit=200)
+        photos = await self.store.get_photos(
+            [photo_id for _, photo_id, _ in matches],
+            visible_to=None if self._is_moderator(interaction.user) else interaction.user.id
+        )
+        matches = [(distance, photos[photo_id]) for distance, photo_id, _ in matches if photo_id in photos][:10]
+        
+        if not matches:
+            embed = discord.Embed(
+                title=f"{self.emoji['camera']} No Similar Photos",
+                description="No photos look like this one.",
+                color=discord.Color.blue()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        
+        
         embed = discord.Embed(
-            title=f"{self.emoji['folder']} {target_user.display_name}'s Photo Gallery",
-            description="Select a folder to view photos:",
+            title=f"{self.emoji['camera']} Similar Photos",
+            description="\n".join(
+                f"**{number}.** {photo['title']} by <@{photo['user_id']}> in \"{photo['folder']}\" ({100 - distance * 100 // 64}% match)"
+                for number, (distance, photo) in enumerate(matches, start=1)
+            ),
             color=discord.Color.blurple()
         )
         
+        files = []
+        best = matches[0][1]
+        thumbnail_url, file = await self._get_photo_image(best['user_id'], best['folder'], best, RENDITIONS['thumb'])
+        embed.set_thumbnail(url=thumbnail_url)
+        if file:
+            files.append(file)
         
-        total_photos = sum(len(photos) for photos in photos_by_folder.values())
-        embed.set_footer(text=f"Total photos: {total_photos}")
+        await interaction.followup.send(embed=embed, files=files, ephemeral=True)
+    
+    @app_commands.command(
+        name="equipment",
+        description="Find photos shot on a camera, lens or focal length"
+    )
+    async def equipment(self, interaction: discord.Interaction, camera: str = None, lens: str = None, focal_length: int = None):
+        """Find photos by the camera, lens or focal length recorded in their EXIF data"""
+        if not (camera or lens or focal_length):
+            await interaction.response.send_message("Give a camera, lens or focal length to search for.", ephemeral=True)
+            return
         
-        view = discord.ui.View()
+        photos, total = await self.store.find_photos_by_equipment(
+            camera=camera,
+            lens=lens,
+            focal_length=focal_length,
+            visible_to=None if self._is_moderator(interaction.user) else interaction.user.id
+        )
         
+        search = ", ".join(part for part in (camera, lens, f"{focal_length}mm" if focal_length else None) if part)
+        if not photos:
+            embed = discord.Embed(
+                title=f"{self.emoji['camera']} No Photos",
+                description=f"No photos were shot on {search}.",
+                color=discord.Color.blue()
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
         
-        select = discord.ui.Select(
-            placeholder="Choose a folder",
-            options=[
-                discord.SelectOption(
-                    label=folder_name,
-                    value=folder_name,
-                    emoji=self.emoji['folder'],
-                    description=f"{len(photos)} photos"
-                )
-                for folder_name, photos in photos_by_folder.items()
-            ]
+        
+        lines = [
+            f"**{number}.** {photo['title']} by <@{photo['user_id']}> - {self._format_exif(photo.get('exif', {}))}"
+            for number, photo in enumerate(photos, start=1)
+        ]
+        if total > len(photos):
+            lines.append(f"...and {total - len(photos)} more")
+        
+        embed = discord.Embed(
+            title=f"{self.emoji['camera']} Shot on {search}",
+            description="\n".join(lines),
+            color=discord.Color.blurple()
         )
+        embed.set_footer(text=f"{total} photos")
         
-        async def select_callback(select_interaction):
-            folder_name = select.values[0]
-            await select_interaction.response.defer()
-            
-            
-            await self._show_photos_in_folder(interaction, target_user, photos_by_folder, folder_name)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    async def _show_folder_selection(self, interaction, target_user, summary):
+        """Show folder selection for viewing photos"""
+        embed = discord.Embed(
+            title=f"{self.emoji['folder']} {target_user.display_name}'s Photo Gallery",
+            description="Select a folder to view photos:",
+            color=discord.Color.blurple()
+        )
+        
+        
+        embed.set_footer(text=f"Total photos: {summary['photos']}")
         
-        select.callback = select_callback
-        view.add_item(select)
         
-        await interaction.response.send_message(embed=embed, view=view, ephemeral=interaction.user == target_user)
+        files = []
+        latest = summary['latest']
+        if latest:
+            thumbnail_url, file = await self._get_photo_image(target_user.id, latest['folder'], latest, RENDITIONS['thumb'])
+            embed.set_thumbnail(url=thumbnail_url)
+            if file:
+                files.append(file)
+        
+        view = GalleryView(self, interaction, target_user, summary['folders'])
+        await view.load()
+        
+        await interaction.response.send_message(embed=embed, view=view, files=files, ephemeral=interaction.user == target_user)
     
-    async def _show_photos_in_folder(self, interaction, target_user, photos_by_folder, folder_name):
+    async def _show_photos_in_folder(self, interaction, target_user, folder_name):
         """Show photos in the selected folder"""
-        if folder_name not in photos_by_folder or not photos_by_folder[folder_name]:
+        total = await self.store.count_photos(target_user.id, folder_name)
+        if not total:
             embed = discord.Embed(
                 title=f"{self.emoji['folder']} {folder_name}",
                 description="This folder is empty.",
@@ -662,25 +886,27 @@ class UploadCog(commands.Cog):
             await interaction.edit_original_response(embed=embed, view=None)
             return
         
-        photos = photos_by_folder[folder_name]
         
-        
-        browser = PhotoBrowserView(self, interaction.user, target_user, folder_name, photos)
+        browser = PhotoBrowserView(self, interaction.user, target_user, folder_name, total)
         await browser.start(interaction)
 
 class FolderSelectionView(discord.ui.View):
-    def __init__(self, cog, user, folders, image, title, description):
+    def __init__(self, cog, user, folders, images, title, description):
         super().__init__(timeout=300)
         self.cog = cog
         self.user = user
         self.folders = folders
-        self.image = image
+        self.images = images
         self.title = title
         self.description = description
         
         
         self._add_folder_buttons()
     
+    @property
+    def noun(self):
+        return "photo" if len(self.images) == 1 else f"{len(self.images)} photos"
+    
     def _add_folder_buttons(self):
         """Add buttons for each folder"""
         for folder in self.folders:
@@ -699,10 +925,21 @@ class FolderSelectionView(discord.ui.View):
                 await interaction.response.defer(ephemeral=True)
                 
                 
+                if len(self.images) > 1:
+                    results = await self.cog._save_photos(
+                        str(self.user.id),
+                        folder_name,
+                        self.images,
+                        self.title,
+                        self.description
+                    )
+                    await interaction.followup.send(embed=self._batch_embed(folder_name, results), ephemeral=True)
+                    return
+                
                 success, result = await self.cog._save_photo(
                     str(self.user.id),
                     folder_name,
-                    self.image,
+                    self.images[0],
                     self.title,
                     self.description
                 )
@@ -744,6 +981,15 @@ class FolderSelectionView(discord.ui.View):
                         inline=True
                     )
                     
+                    
+                    duplicates = await self.cog._find_near_duplicates(self.user.id, result)
+                    if duplicates:
+                        embed.add_field(
+                            name="Similar photos already in your portfolio",
+                            value="\n".join(f"{photo['title']} in \"{photo['folder']}\"" for photo in duplicates),
+                            inline=False
+                        )
+                    
                     await interaction.followup.send(embed=embed, ephemeral=True)
                 else:
                     embed = discord.Embed(
@@ -782,7 +1028,7 @@ class FolderSelectionView(discord.ui.View):
             modal.add_item(folder_name_input)
             
             async def modal_callback(modal_interaction):
-                success, result = self.cog._create_folder(str(self.user.id), folder_name_input.value)
+                success, result = await self.cog._create_folder(str(self.user.id), folder_name_input.value)
                 
                 if success:
                     
@@ -794,7 +1040,7 @@ class FolderSelectionView(discord.ui.View):
                     
                     embed = discord.Embed(
                         title=f"{self.cog.emoji['folder']} Select Folder",
-                        description=f"Folder \"{result}\" created! Please select a folder to upload your photo to:",
+                        description=f"Folder \"{result}\" created! Please select a folder to upload your {self.noun} to:",
                         color=discord.Color.blurple()
                     )
                     
@@ -814,6 +1060,47 @@ class FolderSelectionView(discord.ui.View):
         new_folder_button.callback = new_folder_callback
         self.add_item(new_folder_button)
 
+    def _batch_embed(self, folder_name, results):
+        """Summarise a batch upload, listing what was uploaded and what failed"""
+        uploaded = [result for success, result in results if success]
+        failed = [(image, result) for image, (success, result) in zip(self.images, results) if not success]
+        
+        if not uploaded:
+            title = f"{self.cog.emoji['denied']} Upload Failed"
+            color = discord.Color.red()
+        else:
+            title = f"{self.cog.emoji['check']} Photos Uploaded"
+            color = discord.Color.green() if not failed else discord.Color.gold()
+        
+        embed = discord.Embed(
+            title=title,
+            description=f"{len(uploaded)} of {len(results)} photos uploaded to \"{folder_name}\".",
+            color=color
+        )
+        
+        if uploaded:
+            size_kb = sum(photo['size'] for photo in uploaded) / 1024
+            size_str = f"{size_kb:.1f} KB" if size_kb < 1024 else f"{size_kb/1024:.1f} MB"
+            embed.add_field(
+                name="Uploaded",
+                value="\n".join(photo['title'] for photo in uploaded)[:1024],
+                inline=False
+            )
+            embed.add_field(
+                name="Total Size",
+                value=size_str,
+                inline=True
+            )
+        
+        if failed:
+            embed.add_field(
+                name="Failed",
+                value="\n".join(f"{image.filename}: {error}" for image, error in failed)[:1024],
+                inline=False
+            )
+        
+        return embed
+    
     async def on_timeout(self):
         """Handle view timeout"""
         try:
@@ -826,15 +1113,104 @@ class FolderSelectionView(discord.ui.View):
         except:
             pass
 
+class GalleryView(discord.ui.View):
+    def __init__(self, cog, interaction, target_user, total_folders, page_size=25):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.interaction = interaction
+        self.target_user = target_user
+        self.total_folders = total_folders
+        self.page_size = page_size
+        self.page = 0
+        self.cursors = [None]
+        self.folders = []
+    
+    @property
+    def total_pages(self):
+        return max(1, -(-self.total_folders // self.page_size))
+    
+    async def load(self):
+        """Load the current page of folders and rebuild the menu"""
+        self.folders = await self.cog.store.get_folder_page(self.target_user.id, self.cursors[self.page], self.page_size)
+        self.update_items()
+    
+    def update_items(self):
+        """Rebuild the folder menu, adding page buttons when there are more folders than fit in one menu"""
+        self.clear_items()
+        
+        placeholder = "Choose a folder"
+        if self.total_pages > 1:
+            placeholder += f" (page {self.page + 1}/{self.total_pages})"
+        
+        select = discord.ui.Select(
+            placeholder=placeholder,
+            options=[
+                discord.SelectOption(
+                    label=folder['name'],
+                    value=folder['name'],
+                    emoji=self.cog.emoji['folder'],
+                    description=f"{folder['count']} photos"
+                )
+                for folder in self.folders
+            ]
+        )
+        
+        async def select_callback(select_interaction):
+            folder_name = select.values[0]
+            await select_interaction.response.defer()
+            
+            
+            await self.cog._show_photos_in_folder(self.interaction, self.target_user, folder_name)
+        
+        select.callback = select_callback
+        self.add_item(select)
+        
+        if self.total_pages > 1:
+            prev_button = discord.ui.Button(
+                label="Previous",
+                style=discord.ButtonStyle.secondary,
+                emoji=self.cog.emoji['arrowleft'],
+                disabled=self.page == 0
+            )
+            prev_button.callback = self.prev_page
+            self.add_item(prev_button)
+            
+            next_button = discord.ui.Button(
+                label="Next",
+                style=discord.ButtonStyle.secondary,
+                emoji=self.cog.emoji['arrowright'],
+                disabled=self.page >= self.total_pages - 1
+            )
+            next_button.callback = self.next_page
+            self.add_item(next_button)
+    
+    async def prev_page(self, interaction):
+        self.page = max(0, self.page - 1)
+        await self.load()
+        await interaction.response.edit_message(view=self)
+    
+    async def next_page(self, interaction):
+        if self.folders and self.page < self.total_pages - 1:
+            self.cursors[self.page + 1:] = [self.folders[-1]['name']]
+            self.page += 1
+        await self.load()
+        await interaction.response.edit_message(view=self)
+
 class PhotoBrowserView(discord.ui.View):
-    def __init__(self, cog, user, target_user, folder_name, photos):
+    def __init__(self, cog, user, target_user, folder_name, total, window_size=10, prefetch=1):
         super().__init__(timeout=300)
         self.cog = cog
         self.user = user
         self.target_user = target_user
         self.folder_name = folder_name
-        self.photos = photos
+        self.total = total
+        self.window_size = window_size
+        self.prefetch = prefetch
+        self.photos = []
+        self.window_start = 0
         self.current_index = 0
+        self._window_lock = asyncio.Lock()
+        self._prefetched = {}
         
         
         self._add_navigation_buttons()
@@ -865,7 +1241,7 @@ class PhotoBrowserView(discord.ui.View):
             label="Next",
             style=discord.ButtonStyle.secondary,
             emoji=self.cog.emoji['arrowright'],
-            disabled=self.current_index == len(self.photos) - 1
+            disabled=self.current_index == self.total - 1
         )
         
         async def next_callback(interaction):
@@ -873,7 +1249,7 @@ class PhotoBrowserView(discord.ui.View):
                 await interaction.response.send_message("You can't browse someone else's photos.", ephemeral=True)
                 return
             
-            self.current_index = min(len(self.photos) - 1, self.current_index + 1)
+            self.current_index = min(self.total - 1, self.current_index + 1)
             await self.update_view(interaction)
         
         next_button.callback = next_callback
@@ -883,9 +1259,65 @@ class PhotoBrowserView(discord.ui.View):
         """Start the photo browser"""
         await self.update_view(interaction)
     
+    async def _get_photo(self, index):
+        """Get (index, photo) for the photo at index, fetching the next or previous window of photos if it isn't loaded"""
+        store = self.cog.store
+        user_id = self.target_user.id
+        
+        async with self._window_lock:
+            if not self.photos:
+                self.photos = await store.get_photos_after(user_id, self.folder_name, 0, self.window_size)
+                self.window_start = 0
+            
+            while index >= self.window_start + len(self.photos):
+                photos = await store.get_photos_after(user_id, self.folder_name, self.photos[-1]['id'], self.window_size)
+                if not photos:
+                    break
+                self.window_start += len(self.photos)
+                self.photos = photos
+            
+            while index < self.window_start:
+                photos = await store.get_photos_before(user_id, self.folder_name, self.photos[0]['id'], self.window_size)
+                if not photos:
+                    break
+                self.window_start = max(0, self.window_start - len(photos))
+                self.photos = photos
+            
+            index = min(max(index, self.window_start), self.window_start + len(self.photos) - 1)
+            return index, self.photos[index - self.window_start]
+    
+    async def _load(self, index, warm=False):
+        """Load the photo at index and its display rendition"""
+        index, photo = await self._get_photo(index)
+        image = await self.cog._load_photo_image(self.target_user.id, self.folder_name, photo, RENDITIONS['display'], warm=warm)
+        return index, photo, image
+    
+    def _prefetch_neighbours(self):
+        """Start loading the photos either side of the current one, dropping prefetches that are no longer adjacent"""
+        wanted = {
+            index for index in range(self.current_index - self.prefetch, self.current_index + self.prefetch + 1)
+            if 0 <= index < self.total and index != self.current_index
+        }
+        
+        for index in list(self._prefetched):
+            if index not in wanted:
+                self._prefetched.pop(index).cancel()
+        
+        for index in wanted:
+            if index not in self._prefetched:
+                task = asyncio.create_task(self._load(index, warm=True))
+                task.add_done_callback(lambda task: task.cancelled() or task.exception())
+                self._prefetched[index] = task
+    
     async def update_view(self, interaction):
-        """Update the view with the current photo using CDN URL"""
-        photo = self.photos[self.current_index]
+        """Update the view with the current photo, served from local storage when available"""
+        task = self._prefetched.pop(self.current_index, None)
+        loaded = None
+        if task and task.done() and not task.cancelled() and not task.exception():
+            loaded = task.result()
+        self.current_index, photo, (image_url, filename, data) = loaded or await self._load(self.current_index)
+        file = discord.File(BytesIO(data), filename=filename) if data is not None else None
+        self._prefetch_neighbours()
         
         
         embed = discord.Embed(
@@ -895,7 +1327,7 @@ class PhotoBrowserView(discord.ui.View):
         )
         
         
-        embed.set_image(url=photo['cdn_url'])
+        embed.set_image(url=image_url)
         
         
         embed.add_field(
@@ -914,14 +1346,23 @@ class PhotoBrowserView(discord.ui.View):
             inline=True
         )
         
-        embed.set_footer(text=f"Photo {self.current_index + 1} of {len(self.photos)}")
+        shot_on = self.cog._format_exif(photo.get('exif', {}))
+        if shot_on:
+            embed.add_field(
+                name="Shot On",
+                value=shot_on,
+                inline=False
+            )
+        
+        embed.set_footer(text=f"Photo {self.current_index + 1} of {self.total}")
         
         
         try:
+            attachments = [file] if file else []
             if interaction.response.is_done():
-                await interaction.edit_original_response(embed=embed, view=self)
+                await interaction.edit_original_response(embed=embed, view=self, attachments=attachments)
             else:
-                await interaction.response.send_message(embed=embed, view=self, ephemeral=self.user == self.target_user)
+                await interaction.response.send_message(embed=embed, view=self, files=attachments, ephemeral=self.user == self.target_user)
         except Exception as e:
             embed = discord.Embed(
                 title=f"{self.cog.emoji['denied']} Error",
@@ -932,6 +1373,10 @@ class PhotoBrowserView(discord.ui.View):
     
     async def on_timeout(self):
         """Handle view timeout"""
+        for task in self._prefetched.values():
+            task.cancel()
+        self._prefetched.clear()
+        
         try:
             embed = discord.Embed(
                 title=f"{self.cog.emoji['denied']} Timed Out",